@@ -0,0 +1,163 @@
+import heapq
+import math
+from compiled_graph import CLOSED
+from search import shortest_path_tree
+
+# k shortest loopless paths (Yen's algorithm) for offering alternative routes.
+#
+# Plain Yen runs one full search per node of every accepted path. Here the searches share
+# most of their work:
+# - One Dijkstra from the goal over the reversed graph (cached per goal on the compiled
+#   graph) gives every node's exact distance to the goal and its next hop toward it.
+# - Each spur search is A* with that distance as the heuristic. Blocking nodes and edges
+#   can only lengthen paths, so the heuristic stays consistent, and the search stops as
+#   soon as it pops a node whose tree path to the goal avoids everything blocked: that
+#   path is an optimal completion. Most spur searches settle a handful of nodes.
+# - Spur searches keep their state in dicts, so they cost memory for what they explore
+#   rather than for the whole graph.
+# - A path only spurs from its deviation point onward (Lawler): earlier spur nodes share
+#   their root with the path it deviated from and were searched when that path was taken.
+
+# Goal trees kept per compiled graph
+GOAL_TREES = 4
+
+def goal_tree(cg, goal_id):
+    """
+    (to_goal, next_hop) lists for goal_id: the cost from every node to the goal and the
+    next node on its shortest path there (math.inf and -1 when it cannot reach the goal).
+    Cached on cg, so the same goal does not need a new tree until the graph changes.
+    """
+    trees = cg.cache.setdefault("goal_trees", {})
+    tree = trees.pop(goal_id, None)
+    if tree is None:
+        tree = shortest_path_tree(cg.reversed(), goal_id)
+        while len(trees) >= GOAL_TREES:
+            del trees[next(iter(trees))] # Oldest first
+    trees[goal_id] = tree # Most recently used last
+    return tree
+
+def _edge_cost(cg, source, target):
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    for i in range(offsets[source], offsets[source + 1]):
+        if targets[i] == target:
+            return weights[i]
+    return math.inf
+
+def _spur_search(cg, spur, goal, blocked, blocked_next, to_goal, next_hop):
+    """
+    Cheapest path from spur to goal that avoids the `blocked` nodes and leaves spur by
+    none of the `blocked_next` nodes. Returns (path_ids, cost, nodes_visited, pops, frontier_left);
+    path_ids is None when there is no such path.
+    """
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    cost_so_far = {spur: 0}
+    parent = {spur: -1}
+    dirty = set() # Nodes whose tree path to the goal runs through a blocked node
+    to_visit = [(to_goal[spur], 0, spur)]
+    nodes_visited = 0
+    pops = 0
+
+    while to_visit:
+        _, current_cost, current = heapq.heappop(to_visit)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+
+        if current != spur:
+            # Follow the tree toward the goal; a clean tree path completes the route
+            tail = [current]
+            node = current
+            while node != goal and node not in blocked and node != spur and node not in dirty:
+                node = next_hop[node]
+                tail.append(node)
+            if node == goal:
+                path = []
+                node = current
+                while node != -1:
+                    path.append(node)
+                    node = parent[node]
+                path.reverse()
+                return path + tail[1:], current_cost + to_goal[current], nodes_visited, pops, len(to_visit)
+            dirty.update(tail)
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            if node in blocked or node == spur or to_goal[node] >= CLOSED:
+                continue
+            if current == spur and node in blocked_next:
+                continue
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far.get(node, math.inf):
+                cost_so_far[node] = new_cost
+                parent[node] = current
+                heapq.heappush(to_visit, (new_cost + to_goal[node], new_cost, node))
+    return None, None, nodes_visited, pops, 0
+
+def _shared_cost(cg, path, edges):
+    return sum(_edge_cost(cg, a, b) for a, b in zip(path, path[1:]) if (a, b) in edges)
+
+def k_shortest_paths(cg, start_id, goal_id, k=3, max_overlap=None, stats=None, max_examined=None):
+    """
+    Up to k loopless paths from start_id to goal_id, cheapest first. Edge costs must be
+    positive. With max_overlap (a fraction), a path is only returned when at most that
+    share of its cost runs over edges of a path already returned; paths are examined in
+    cost order until k are found or max_examined (default 10 * k) have been looked at.
+    Returns ([(path_ids, cost), ...], nodes_visited); a cached goal tree costs no visits.
+    """
+    built = goal_id not in cg.cache.get("goal_trees", {})
+    to_goal, next_hop = goal_tree(cg, goal_id)
+    # Building the goal tree settles every node that can reach the goal
+    nodes_visited = sum(cost != math.inf for cost in to_goal) if built else 0
+    if to_goal[start_id] >= CLOSED or k < 1:
+        if stats is not None:
+            stats.record(nodes_visited, nodes_visited, 0)
+        return [], nodes_visited
+    if max_examined is None:
+        max_examined = 10 * k
+
+    first = [start_id]
+    while first[-1] != goal_id:
+        first.append(next_hop[first[-1]])
+    candidates = [(to_goal[start_id], 0, tuple(first), 0)] # (cost, order, path, deviation index)
+    seen = {tuple(first)}
+    examined = [] # Paths taken off the candidates, returned or not
+    routes = []
+    returned_edges = []
+    pops = nodes_visited
+    frontier_left = 0
+    order = 1
+
+    while candidates and len(routes) < k and len(examined) < max_examined:
+        cost, _, path, deviation = heapq.heappop(candidates)
+        if cost >= CLOSED:
+            break # This and every later candidate runs over a closed edge
+        examined.append(path)
+        edges = set(zip(path, path[1:]))
+        if max_overlap is None or all(_shared_cost(cg, path, other) <= max_overlap * cost for other in returned_edges):
+            routes.append((list(path), cost))
+            returned_edges.append(edges)
+            if len(routes) == k:
+                break
+
+        root_cost = 0
+        for i in range(len(path) - 1):
+            if i >= deviation:
+                spur = path[i]
+                root = path[:i + 1]
+                blocked_next = {other[i + 1] for other in examined if len(other) > i + 1 and other[:i + 1] == root}
+                spur_path, spur_cost, visited, spur_pops, left = _spur_search(cg, spur, goal_id, set(root[:-1]), blocked_next, to_goal, next_hop)
+                nodes_visited += visited
+                pops += spur_pops
+                frontier_left += left
+                if spur_path is not None:
+                    candidate = root[:-1] + tuple(spur_path)
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        heapq.heappush(candidates, (root_cost + spur_cost, order, candidate, i))
+                        order += 1
+            root_cost += _edge_cost(cg, path[i], path[i + 1])
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, frontier_left)
+    return routes, nodes_visited
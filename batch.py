@@ -0,0 +1,100 @@
+import argparse
+import csv
+import json
+import sys
+from instrumentation import LEVELS, OFF, SearchStats
+from parallel_batch import run_parallel_batch
+from router import ALGORITHMS, Router
+
+# Non-interactive batch routing: reads start/goal queries from a JSONL or CSV file
+# (or stdin) and streams one JSON result per line. Never prompts or renders.
+#
+#   python batch.py queries.jsonl -o results.jsonl --algorithm astar
+#   cat queries.csv | python batch.py - --format csv
+#   python batch.py queries.jsonl -o results.jsonl --workers 8   # all cores, see parallel_batch.py
+
+def read_queries(stream, fmt="jsonl"):
+    """
+    Yield query dicts with at least "start" and "goal" keys. A start may also be a
+    "lat, lon" position, which is snapped to the nearest node.
+    JSONL lines may also set "algorithm"; CSV needs a header row with start,goal[,algorithm].
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield row
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def run_batch(router, queries, algorithm="ucs", instrumentation=OFF):
+    """
+    Run every query against the router, yielding one result dict per query in input order.
+    Results carry a "stats" dict unless instrumentation is OFF.
+    """
+    for query in queries:
+        user_start = query.get("start")
+        user_goal = query.get("goal")
+        query_algorithm = query.get("algorithm") or algorithm
+        start = router.locate(user_start) # Names, or "lat, lon" snapped to the nearest node
+        goal = router.resolve(user_goal)
+        stats = SearchStats(instrumentation)
+        path, total_cost, error, nodes_visited, elapsed_time, peak_memory = router.search(query_algorithm, start, goal, user_start, user_goal, stats)
+        result = {
+            "start": user_start,
+            "goal": user_goal,
+            "algorithm": query_algorithm,
+            "path": path,
+            "cost": total_cost,
+            "nodes_visited": nodes_visited,
+            "elapsed_time": elapsed_time,
+            "error": error,
+        }
+        if instrumentation != OFF:
+            result["stats"] = stats.to_dict()
+        yield result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer routing queries without the interactive menu.")
+    parser.add_argument("input", nargs="?", default="-", help="query file, or - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="result file, or - for stdout (default)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from file extension, else jsonl)")
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS), default="ucs", help="algorithm for queries that do not name one")
+    parser.add_argument("--instrumentation", choices=LEVELS, default=OFF, help="per-query statistics to include (deep traces memory and is slow)")
+    parser.add_argument("--map", help="map file to route on (see graph_io.load_map; default: the campus map)")
+    parser.add_argument("--edges", help="edges file when --map is a CSV nodes file")
+    parser.add_argument("--hierarchy", help="contraction hierarchy file for the ch algorithm (see contraction.py)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes; 0 uses every core (default 1)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="queries handed to the workers at a time (default 10000)")
+    args = parser.parse_args(argv)
+    parallel = args.workers != 1
+    if parallel and args.instrumentation != OFF:
+        parser.error("--instrumentation needs --workers 1")
+    if parallel and args.hierarchy:
+        parser.error("--hierarchy needs --workers 1")
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        router = Router.load(args.map, args.edges) if args.map else Router()
+        if args.hierarchy:
+            router.load_hierarchy(args.hierarchy)
+        queries = read_queries(source, fmt)
+        if parallel:
+            results = run_parallel_batch(router, queries, args.algorithm, args.workers or None, args.chunk_size)
+        else:
+            results = run_batch(router, queries, args.algorithm, args.instrumentation)
+        for result in results:
+            sink.write(json.dumps(result) + "\n")
+            if sink is sys.stdout:
+                sink.flush() # Stream results to a pipe as they are produced
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+if __name__ == "__main__":
+    main()
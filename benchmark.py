@@ -0,0 +1,218 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from instrumentation import DEEP, OFF, SearchStats, summarize
+from router import ALGORITHMS, Router
+from synthetic_maps import GENERATORS
+
+# Reproducible benchmarks for the search algorithms. Maps come from synthetic_maps.py (or
+# the built-in campus map), queries are drawn with a fixed seed, and every algorithm answers
+# the same queries. Latency is the best of a few passes, measured with instrumentation OFF
+# and the route cache disabled; peak memory comes from a separate DEEP pass over the first
+# few queries, so tracemalloc never inflates the timings.
+#
+#   python benchmark.py run --graphs grid,road --sizes 100,10000 -o results.json
+#   python benchmark.py compare baseline.json results.json --threshold 0.25
+
+def make_router(graph_name, size, seed):
+    if graph_name == "campus":
+        return Router(cache_size=0)
+    graph, coordinates, non_eatery_nodes = GENERATORS[graph_name](size, seed)
+    return Router(graph, coordinates, non_eatery_nodes, cache_size=0)
+
+def make_queries(router, count, seed):
+    """Fixed-seed (start, goal) pairs; goals are eateries, since only those are valid goals."""
+    rng = random.Random(seed)
+    nodes = sorted(router.graph)
+    eateries = sorted(router.eateries())
+    return [(rng.choice(nodes), rng.choice(eateries)) for _ in range(count)]
+
+def bench_algorithm(router, algorithm, queries, memory_queries, repeat=3):
+    """Run every query with one algorithm and return its result record."""
+    # Warm up with the first query: builds the compiled graph and any per-graph
+    # preprocessing (landmarks, hierarchy) the algorithm needs, timed separately
+    started = time.perf_counter()
+    router.search(algorithm, *queries[0])
+    setup_time = time.perf_counter() - started
+
+    # Each query's latency is its best time over `repeat` passes, which filters out most
+    # scheduler and cache noise; throughput comes from the fastest whole pass
+    latencies = [float("inf")] * len(queries)
+    visited = []
+    costs = []
+    errors = 0
+    total_time = float("inf")
+    for _ in range(repeat):
+        visited.clear()
+        costs.clear()
+        errors = 0
+        started = time.perf_counter()
+        for i, (start, goal) in enumerate(queries):
+            stats = SearchStats(OFF)
+            query_started = time.perf_counter()
+            path, total_cost, error, nodes_visited, _, _ = router.search(algorithm, start, goal, stats=stats)
+            latencies[i] = min(latencies[i], time.perf_counter() - query_started)
+            visited.append(nodes_visited or 0)
+            costs.append(total_cost)
+            errors += error is not None
+        total_time = min(total_time, time.perf_counter() - started)
+
+    peak_memory = 0
+    for start, goal in queries[:memory_queries]:
+        stats = SearchStats(DEEP)
+        router.search(algorithm, start, goal, stats=stats)
+        peak_memory = max(peak_memory, stats.peak_memory or 0)
+
+    return {
+        "algorithm": algorithm,
+        "queries": len(queries),
+        "errors": errors,
+        "setup_time": setup_time,
+        "latency": summarize(latencies),
+        "nodes_visited": summarize(visited),
+        "throughput": len(queries) / total_time if total_time else None,
+        "peak_memory": peak_memory,
+    }, costs
+
+def run(graph_names, sizes, algorithms, query_count, seed, memory_queries, repeat=3, progress=None):
+    """Benchmark every algorithm on every map; returns the result document."""
+    results = []
+    for graph_name in graph_names:
+        for size in ([None] if graph_name == "campus" else sizes):
+            started = time.perf_counter()
+            router = make_router(graph_name, size, seed)
+            generate_time = time.perf_counter() - started
+            cg = router.compiled
+            queries = make_queries(router, query_count, seed)
+            reference = None
+            for algorithm in algorithms:
+                record, costs = bench_algorithm(router, algorithm, queries, memory_queries, repeat)
+                # Every algorithm is exact, so costs must agree with the first one run
+                if reference is None:
+                    reference = costs
+                record["cost_mismatches"] = sum(cost != expected for cost, expected in zip(costs, reference))
+                record.update(graph=graph_name, size=size, nodes=len(cg), edges=cg.edge_count, generate_time=generate_time)
+                results.append(record)
+                if progress is not None:
+                    progress(record)
+    return {
+        "meta": {
+            "seed": seed,
+            "queries": query_count,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+# Metrics checked by compare(); higher is worse for all of them. Timings are noisy on
+# shared machines, but nodes visited is deterministic for a seed, so it is held to its
+# own (by default zero) threshold and catches algorithmic regressions exactly.
+COMPARED_METRICS = (
+    ("latency.p50", False, lambda record: record["latency"]["p50"]),
+    ("latency.p95", False, lambda record: record["latency"]["p95"]),
+    ("latency.p99", False, lambda record: record["latency"]["p99"]),
+    ("nodes_visited.mean", True, lambda record: record["nodes_visited"]["mean"]),
+    ("peak_memory", False, lambda record: record["peak_memory"]),
+)
+
+def compare(baseline, current, threshold=0.25, visited_threshold=0.0):
+    """
+    Compare two result documents. Returns a list of regressions as
+    (graph, size, algorithm, metric, baseline value, current value), for every metric
+    that grew by more than `threshold` (a fraction; `visited_threshold` for nodes
+    visited) or any cost mismatch that appeared.
+    """
+    key = lambda record: (record["graph"], record["size"], record["algorithm"])
+    old = {key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        before = old.get(key(record))
+        if before is None:
+            continue
+        for metric, is_visited, value in COMPARED_METRICS:
+            was, now = value(before), value(record)
+            allowed = visited_threshold if is_visited else threshold
+            if was is not None and now is not None and now > was * (1 + allowed):
+                regressions.append(key(record) + (metric, was, now))
+        if record["cost_mismatches"] > before["cost_mismatches"]:
+            regressions.append(key(record) + ("cost_mismatches", before["cost_mismatches"], record["cost_mismatches"]))
+    return regressions
+
+def print_record(record):
+    latency = record["latency"]
+    size = "" if record["size"] is None else f" {record['size']}"
+    print(f"{record['graph']}{size} ({record['nodes']} nodes) {record['algorithm']}: "
+          f"p50 {latency['p50'] * 1000:.3f} ms, p95 {latency['p95'] * 1000:.3f} ms, p99 {latency['p99'] * 1000:.3f} ms, "
+          f"visited {record['nodes_visited']['mean']:.0f}, {record['throughput']:.0f} q/s, "
+          f"peak {record['peak_memory'] / 1024:.1f} KB, setup {record['setup_time']:.3f} s"
+          + (f", {record['cost_mismatches']} COST MISMATCHES" if record["cost_mismatches"] else ""), flush=True)
+
+def print_winners(document):
+    """Print the fastest algorithm (by p50 latency) for every map and size."""
+    best = {}
+    for record in document["results"]:
+        key = (record["graph"], record["size"])
+        if key not in best or record["latency"]["p50"] < best[key]["latency"]["p50"]:
+            best[key] = record
+    for (graph, size), record in best.items():
+        where = graph if size is None else f"{graph} {size}"
+        print(f"Fastest on {where}: {record['algorithm']} (p50 {record['latency']['p50'] * 1000:.3f} ms)")
+
+def _size(text):
+    return int(float(text)) # Accepts 1e6
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms on synthetic maps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--graphs", default="campus,grid,geometric,road", help="comma-separated maps: campus, " + ", ".join(GENERATORS))
+    run_parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated node counts for generated maps (up to 1e6)")
+    run_parser.add_argument("--algorithms", default=",".join(ALGORITHMS), help="comma-separated algorithms (default: all)")
+    run_parser.add_argument("--queries", type=int, default=200, help="queries per map (default 200)")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed for maps and queries (default 0)")
+    run_parser.add_argument("--repeat", type=int, default=3, help="passes over the queries; each latency is the best pass (default 3)")
+    run_parser.add_argument("--memory-queries", type=int, default=10, help="queries rerun with memory tracing (default 10)")
+    run_parser.add_argument("-o", "--output", default="benchmark.json", help="result file (default benchmark.json)")
+    compare_parser = commands.add_parser("compare", help="flag regressions against a saved baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="allowed growth of latency and memory as a fraction (default 0.25)")
+    compare_parser.add_argument("--visited-threshold", type=float, default=0.0, help="allowed growth of nodes visited as a fraction (default 0)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        graph_names = args.graphs.split(",")
+        algorithms = args.algorithms.split(",")
+        for name in graph_names:
+            if name != "campus" and name not in GENERATORS:
+                parser.error(f"unknown map '{name}'")
+        for algorithm in algorithms:
+            if algorithm not in ALGORITHMS:
+                parser.error(f"unknown algorithm '{algorithm}'")
+        document = run(graph_names, [_size(size) for size in args.sizes.split(",")], algorithms,
+                       args.queries, args.seed, args.memory_queries, args.repeat, print_record)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+        print_winners(document)
+        print(f"Wrote {len(document['results'])} results to {args.output}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold, args.visited_threshold)
+    for graph, size, algorithm, metric, was, now in regressions:
+        where = graph if size is None else f"{graph} {size}"
+        print(f"REGRESSION {where} {algorithm} {metric}: {was:.6g} -> {now:.6g} ({(now / was - 1) * 100 if was else float('inf'):+.1f}%)")
+    print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# Built-in campus map: edge costs, node coordinates and the nodes that are not eateries
+
+graph = {
+    "sherwood place": {"jollibee": 60},
+    "jollibee": {"sherwood place": 60, "taft-castro": 44},
+    "taft-castro": {"jollibee": 44, "gokongwei hall": 28, "agno-castro": 85},
+    "gokongwei hall": {"taft-castro": 28, "taft-dagonoy": 85},
+    "agno-castro": {"taft-castro": 85, "agno food court": 29, "andrew gonzales hall": 62},
+    "agno food court": {"agno-castro": 29, "24 chicken": 44},
+    "24 chicken": {"agno food court": 44, "agno-fidel a. reyes": 41},
+    "agno-fidel a. reyes": {"24 chicken": 41, "taft-dagonoy": 80},
+    "andrew gonzales hall": {"perico's": 23, "agno-castro": 62},
+    "perico's": {"the barn": 53, "andrew gonzales hall": 23},
+    "the barn": {"perico's": 53},
+    "taft-dagonoy": {"gokongwei hall": 85, "tinuhog ni benny": 59, "north gate": 72, "agno-fidel a. reyes": 80},
+    "tinuhog ni benny": {"taft-dagonoy": 59, "leon guinto-dagonoy": 40},
+    "leon guinto-dagonoy": {"tinuhog ni benny": 40, "drip kofi": 84},
+    "drip kofi": {"leon guinto-dagonoy": 84, "chomp chomp": 35},
+    "chomp chomp": {"drip kofi": 35, "leon guinto-estrada": 42},
+    "leon guinto-estrada": {"chomp chomp": 42, "taft-estrada": 95},
+    "taft-estrada": {"south gate": 41, "leon guinto-estrada": 95, "north gate": 99},
+    "north gate": {"taft-estrada": 99, "taft-dagonoy": 72, "cbtl": 73},
+    "cbtl": {"north gate": 73},
+    "south gate": {"taft-estrada": 41, "mcdonald's": 54, "kitchen city": 82},
+    "mcdonald's": {"south gate": 54, "tomo coffee": 28},
+    "tomo coffee": {"mcdonald's": 28},
+    "kitchen city": {"south gate": 82},
+}
+
+coordinates = {
+    "sherwood place": (14.56757, 120.99283),
+    "jollibee": (14.56709, 120.99308),
+    "taft-castro": (14.56672, 120.99324),
+    "gokongwei hall": (14.56648, 120.99336),
+    "agno-castro": (14.56641, 120.99252),
+    "agno food court": (14.56619, 120.99265),
+    "24 chicken": (14.56585, 120.99284),
+    "agno-fidel a. reyes": (14.56554, 120.99299),
+    "andrew gonzales hall": (14.56692, 120.99228),
+    "perico's": (14.5671, 120.99218),
+    "the barn": (14.56754, 120.99197),
+    "taft-dagonoy": (14.56577, 120.9937),
+    "tinuhog ni benny": (14.56598, 120.99419),
+    "leon guinto-dagonoy": (14.56611, 120.99454),
+    "drip kofi": (14.56542, 120.99489),
+    "chomp chomp": (14.56512, 120.99501),
+    "leon guinto-estrada": (14.56477, 120.99516),
+    "taft-estrada": (14.5644, 120.99435),
+    "north gate": (14.56518, 120.99396),
+    "cbtl": (14.56497, 120.99333),
+    "south gate": (14.56409, 120.99449),
+    "mcdonald's": (14.56363, 120.99465),
+    "tomo coffee": (14.56342, 120.99476),
+    "kitchen city": (14.56382, 120.99379),
+}
+
+# List of non-eatery nodes that cannot be used as end goals
+non_eatery_nodes = {
+    "gokongwei hall", "taft-castro", "agno-castro", "agno-fidel a. reyes", "taft-dagonoy",
+    "leon guinto-dagonoy", "leon guinto-estrada", "taft-estrada", "north gate", "south gate"
+}
@@ -0,0 +1,212 @@
+import hashlib
+import math
+from array import array # Compact typed storage for the CSR arrays
+
+# Weight of a closed edge (math.inf) in an integer-weighted graph, whose 'q' array cannot
+# hold infinity. It is larger than any real route cost, so the search kernels treat a
+# cost >= CLOSED as unreachable, and small enough that paths over many closed edges
+# still fit the 64-bit keys of the radix heap.
+CLOSED = 2 ** 48
+
+
+class CompiledGraph:
+    """
+    Array-backed (CSR) snapshot of a dict-of-dicts graph.
+    Node names are interned to integer ids 0..n-1. The outgoing edges of node i are
+    targets[offsets[i]:offsets[i + 1]] with the matching entries in weights.
+    Coordinates are kept in the parallel lat/lon arrays (NaN when unknown).
+    The snapshot is never mutated, so data derived from it (heuristic tables, the
+    reversed graph, ...) is stored in `cache` and dropped together with it after an edit.
+    The arrays may also be memoryviews, e.g. over shared memory (see parallel_batch.py).
+    The one exception to immutability is set_weight(), which changes an edge cost in place
+    for incremental replanning (see replanning.py) and drops the derived data.
+    A graph loaded from a snapshot also carries `eatery`, one byte per node (1 for
+    eateries); compile_graph() leaves it None.
+    """
+
+    # Search state is one list entry per node (see node_array)
+    sparse = False
+
+    def __init__(self, names, offsets, targets, weights, lat, lon, ids=None, eatery=None):
+        self.names = names
+        self.ids = ids if ids is not None else {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.lat = lat
+        self.lon = lon
+        self.eatery = eatery
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def node_id(self, name):
+        """Return the integer id of a node name, or None if it is not in the graph."""
+        return self.ids.get(name)
+
+    def neighbors(self, node_id):
+        """Yield (neighbor_id, weight) pairs for the outgoing edges of node_id."""
+        lo, hi = self.offsets[node_id], self.offsets[node_id + 1]
+        return zip(self.targets[lo:hi], self.weights[lo:hi])
+
+    def reversed(self):
+        """
+        Return a CompiledGraph with every edge reversed (same node ids), built once and cached.
+        For the undirected campus map this has the same edges, but imported data may not be symmetric.
+        """
+        reverse = self.cache.get("reversed")
+        if reverse is not None:
+            return reverse
+        n = len(self.names)
+        # Counting sort of the edges by target
+        counts = [0] * (n + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        offsets = array('q', counts)
+        targets = array('q', bytes(8 * len(self.targets)))
+        weights = array(typecode(self.weights), bytes(self.weights.itemsize * len(self.weights)))
+        fill = counts[:n]
+        for node in range(n):
+            for i in range(self.offsets[node], self.offsets[node + 1]):
+                target = self.targets[i]
+                slot = fill[target]
+                targets[slot] = node
+                weights[slot] = self.weights[i]
+                fill[target] = slot + 1
+        reverse = CompiledGraph(self.names, offsets, targets, weights, self.lat, self.lon)
+        reverse.ids = self.ids
+        reverse.cache["reversed"] = self
+        self.cache["reversed"] = reverse
+        return reverse
+
+    def set_weight(self, source_id, target_id, weight):
+        """
+        Change the cost of the edge source_id -> target_id in place, here and in the cached
+        reversed graph. Returns the old stored cost, or None if there is no such edge.
+        math.inf closes the edge (stored as CLOSED in an integer graph). Everything else
+        in `cache` is derived from the weights, so it is dropped.
+        """
+        if weight == math.inf and typecode(self.weights) == 'q':
+            weight = CLOSED
+        old = None
+        for i in range(self.offsets[source_id], self.offsets[source_id + 1]):
+            if self.targets[i] == target_id:
+                old = self.weights[i]
+                self.weights[i] = weight
+                break
+        if old is None:
+            return None
+        reverse = self.cache.get("reversed")
+        if reverse is not None:
+            for i in range(reverse.offsets[target_id], reverse.offsets[target_id + 1]):
+                if reverse.targets[i] == source_id:
+                    reverse.weights[i] = weight
+                    break
+            reverse.cache = {"reversed": self}
+            self.cache = {"reversed": reverse}
+        else:
+            self.cache = {}
+        return old
+
+    def fingerprint(self):
+        """
+        Hex digest of the node names, edges and weights, used to detect that data saved
+        for this graph (a contraction hierarchy, a distance matrix, ...) has gone stale.
+        """
+        digest = self.cache.get("fingerprint")
+        if digest is None:
+            h = hashlib.sha1()
+            h.update("\0".join(map(str, self.names)).encode("utf-8"))
+            h.update(self.offsets.tobytes())
+            h.update(self.targets.tobytes())
+            h.update(typecode(self.weights).encode("ascii"))
+            h.update(self.weights.tobytes())
+            digest = self.cache["fingerprint"] = h.hexdigest()
+        return digest
+
+    def path_names(self, path_ids):
+        """Convert a list of node ids back to node names."""
+        names = self.names
+        return [names[i] for i in path_ids]
+
+
+def typecode(values):
+    """Element type of an array or of a memoryview cast to one ('q' or 'd' for weights)."""
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def compile_graph(graph, coordinates=None):
+    """
+    Build a CompiledGraph from the dict-of-dicts `graph` and optional `coordinates`.
+    Weights are stored as 64-bit integers when every edge cost is an int (or math.inf for
+    a closed edge, stored as CLOSED), otherwise as doubles.
+    """
+    names = list(graph.keys())
+    ids = {name: i for i, name in enumerate(names)}
+    # Neighbours that are missing as keys still get an id so no edge is dropped
+    for neighbors in graph.values():
+        for neighbor in neighbors:
+            if neighbor not in ids:
+                ids[neighbor] = len(names)
+                names.append(neighbor)
+
+    integral = all(isinstance(cost, int) or cost == math.inf for neighbors in graph.values() for cost in neighbors.values())
+    offsets = array('q', [0])
+    targets = array('q')
+    weights = array('q' if integral else 'd')
+    for name in names:
+        for neighbor, cost in graph.get(name, {}).items():
+            targets.append(ids[neighbor])
+            weights.append(CLOSED if integral and cost == math.inf else cost)
+        offsets.append(len(targets))
+
+    lat = array('d')
+    lon = array('d')
+    coordinates = coordinates or {}
+    for name in names:
+        point = coordinates.get(name)
+        if point is None:
+            lat.append(math.nan)
+            lon.append(math.nan)
+        else:
+            lat.append(point[0])
+            lon.append(point[1])
+
+    return CompiledGraph(names, offsets, targets, weights, lat, lon)
+
+
+class SparseArray(dict):
+    """Per-node values kept in a dict; nodes never written read as `default`."""
+
+    def __init__(self, default):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, node):
+        return self.default
+
+
+def node_array(cg, default):
+    """
+    Per-query search state with one value per node of cg: a flat list, or a SparseArray
+    when cg.sparse, so memory follows the nodes a search touches instead of len(cg).
+    """
+    return SparseArray(default) if cg.sparse else [default] * len(cg)
+
+
+def reconstruct_path(parent, goal_id):
+    """Follow the flat parent array back from goal_id; returns node ids from start to goal."""
+    path = []
+    current = goal_id
+    while current != -1:
+        path.append(current)
+        current = parent[current]
+    path.reverse()
+    return path
@@ -0,0 +1,57 @@
+# Connected-component labelling for the dict-of-dicts graph. Edges are treated as
+# undirected (weak connectivity), so one-way edges in imported data still hold a
+# component together.
+
+def component_labels(graph):
+    """
+    Label every node with a component id using union-find over the edges.
+    Returns (labels, sizes): labels maps node -> component id, sizes component id -> node count.
+    """
+    names = list(graph)
+    index = {name: i for i, name in enumerate(names)}
+    for neighbors in graph.values():
+        for neighbor in neighbors:
+            if neighbor not in index:
+                index[neighbor] = len(names)
+                names.append(neighbor)
+    parent = list(range(len(names)))
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root: # Path compression
+            parent[i], i = root, parent[i]
+        return root
+
+    for node, neighbors in graph.items():
+        a = find(index[node])
+        for neighbor in neighbors:
+            b = find(index[neighbor])
+            if a != b:
+                parent[b] = a
+
+    labels = {}
+    sizes = {}
+    for name, i in index.items():
+        root = find(i)
+        labels[name] = root
+        sizes[root] = sizes.get(root, 0) + 1
+    return labels, sizes
+
+def primary_component(labels, sizes, anchor=None):
+    """
+    Id of the component to keep: the one holding `anchor` if it is still in the graph,
+    otherwise the largest one (ties go to the component seen first).
+    """
+    if anchor is not None and anchor in labels:
+        return labels[anchor]
+    if not sizes:
+        return None
+    return max(sizes, key=sizes.get)
+
+def detached_nodes(graph, anchor=None):
+    """Return the set of nodes outside the primary component."""
+    labels, sizes = component_labels(graph)
+    primary = primary_component(labels, sizes, anchor)
+    return {node for node, label in labels.items() if label != primary}
@@ -0,0 +1,336 @@
+import heapq
+import math
+import struct
+import time
+from array import array
+from compiled_graph import CLOSED, typecode
+
+# Contraction Hierarchies (CH). Preprocessing contracts the nodes one by one in order of
+# importance, adding a shortcut u -> x (through v) whenever contracting v would otherwise
+# lose the only shortest u -> x path. A query then only has to search "upward" (towards
+# more important nodes) from both ends, which settles a few hundred nodes even on very
+# large maps. Shortcuts remember the node they skip so the full path can be unpacked.
+#
+# The hierarchy belongs to one compiled graph. Router keeps it in that graph's cache, so
+# after add_node/remove_node (which recompile the graph) it is rebuilt on the next CH query,
+# or explicitly with Router.build_hierarchy(). A saved hierarchy is only accepted by
+# load_hierarchy() when the graph fingerprint still matches.
+#
+# File layout (native byte order, checked with a byte-order mark):
+#   header   magic "CSCH", version, byte-order mark, weight typecode, graph fingerprint,
+#            node count, up edge count, down edge count, then the report (original
+#            edges, shortcuts, build seconds)
+#   rank     int64 per node
+#   up       offsets int64 per node + 1, then targets int64, weights, middle int64 per edge
+#   down     the same for the downward edges
+
+MAGIC = b"CSCH"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("=4sHHcx40sQQQQQd")
+BYTE_ORDER_MARK = 0x0102
+
+class ContractionHierarchy:
+    """
+    Result of build_hierarchy(). rank[v] is the contraction order of v. For every node v,
+    up_* (CSR) holds the edges v -> x with rank[x] > rank[v], and down_* holds the edges
+    u -> v with rank[u] > rank[v] stored at v, so the backward search from the goal can
+    walk them in reverse. *_middle is the skipped node of a shortcut, or -1 for an original edge.
+    """
+
+    def __init__(self, fingerprint, rank, up, down, report=None):
+        self.fingerprint = fingerprint
+        self.rank = rank
+        self.up_offsets, self.up_targets, self.up_weights, self.up_middle = up
+        self.down_offsets, self.down_targets, self.down_weights, self.down_middle = down
+        self.report = report or {}
+
+    def __len__(self):
+        return len(self.rank)
+
+    def save(self, path):
+        """Write the hierarchy arrays and the graph fingerprint to `path` (see the layout above)."""
+        report = self.report
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, typecode(self.up_weights).encode("ascii"),
+                self.fingerprint.encode("ascii"), len(self.rank), len(self.up_targets), len(self.down_targets),
+                report.get("edges", 0), report.get("shortcuts", 0), report.get("elapsed_time", 0.0)))
+            for values in (self.rank, self.up_offsets, self.up_targets, self.up_weights, self.up_middle,
+                           self.down_offsets, self.down_targets, self.down_weights, self.down_middle):
+                values.tofile(f)
+
+    def _edge_middle(self, u, v):
+        """Middle node of the hierarchy edge u -> v (-1 if it is an original edge)."""
+        if self.rank[u] < self.rank[v]:
+            offsets, targets, middle, node, other = self.up_offsets, self.up_targets, self.up_middle, u, v
+        else:
+            offsets, targets, middle, node, other = self.down_offsets, self.down_targets, self.down_middle, v, u
+        for i in range(offsets[node], offsets[node + 1]):
+            if targets[i] == other:
+                return middle[i]
+        raise KeyError((u, v))
+
+    def unpack(self, path):
+        """Expand every shortcut on a hierarchy path into the original edges it stands for."""
+        if not path:
+            return path
+        result = [path[0]]
+        stack = []
+        for u, v in zip(path, path[1:]):
+            stack.append((u, v))
+            while stack:
+                a, b = stack.pop()
+                mid = self._edge_middle(a, b)
+                if mid == -1:
+                    result.append(b)
+                else:
+                    # Push the second half first so the first half is expanded first
+                    stack.append((mid, b))
+                    stack.append((a, mid))
+        return result
+
+def load_hierarchy(path, cg):
+    """
+    Load a hierarchy saved with ContractionHierarchy.save(). Raises ValueError if it was
+    built for a different graph (for example before an add_node/remove_node).
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError(f"'{path}' is not a hierarchy file.")
+        magic, version, mark, weight_typecode, fingerprint, n, up_count, down_count, edges, shortcuts, elapsed = HEADER.unpack(header)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported hierarchy format version {version}.")
+        if mark != BYTE_ORDER_MARK:
+            raise ValueError("Hierarchy was written on a machine with a different byte order.")
+        fingerprint = fingerprint.decode("ascii")
+        if fingerprint != cg.fingerprint():
+            raise ValueError("Hierarchy was built for a different graph; rebuild it with build_hierarchy().")
+        weight_typecode = weight_typecode.decode("ascii")
+        arrays = []
+        for code, count in (('q', n), ('q', n + 1), ('q', up_count), (weight_typecode, up_count), ('q', up_count),
+                            ('q', n + 1), ('q', down_count), (weight_typecode, down_count), ('q', down_count)):
+            values = array(code)
+            values.fromfile(f, count)
+            arrays.append(values)
+    report = {"nodes": n, "edges": edges, "shortcuts": shortcuts, "elapsed_time": elapsed}
+    return ContractionHierarchy(fingerprint, arrays[0], arrays[1:5], arrays[5:9], report)
+
+def _witness_cost(out_edges, contracted, source, skip, limit, max_settled):
+    """
+    Local Dijkstra from source that ignores `skip` and contracted nodes. Returns the costs
+    it found (possibly incomplete) after reaching `limit` or settling max_settled nodes.
+    """
+    cost_so_far = {source: 0}
+    to_visit = [(0, source)]
+    settled = 0
+    while to_visit and settled < max_settled:
+        current_cost, current = heapq.heappop(to_visit)
+        if current_cost > cost_so_far[current]:
+            continue
+        if current_cost > limit:
+            break
+        settled += 1
+        for node, (weight, _) in out_edges[current].items():
+            if node == skip or contracted[node]:
+                continue
+            new_cost = current_cost + weight
+            if new_cost < cost_so_far.get(node, math.inf):
+                cost_so_far[node] = new_cost
+                heapq.heappush(to_visit, (new_cost, node))
+    return cost_so_far
+
+def _shortcuts_for(v, out_edges, in_edges, contracted, max_settled):
+    """List the shortcuts (u, x, cost) that contracting v would require."""
+    shortcuts = []
+    outgoing = [(x, w) for x, (w, _) in out_edges[v].items() if not contracted[x]]
+    if not outgoing:
+        return shortcuts
+    max_out = max(w for _, w in outgoing)
+    for u, (w_in, _) in in_edges[v].items():
+        if contracted[u]:
+            continue
+        witness = _witness_cost(out_edges, contracted, u, v, w_in + max_out, max_settled)
+        for x, w_out in outgoing:
+            if x == u:
+                continue
+            via = w_in + w_out
+            if witness.get(x, math.inf) > via:
+                shortcuts.append((u, x, via))
+    return shortcuts
+
+def _priority(v, out_edges, in_edges, contracted, deleted_neighbors, max_settled):
+    """Edge difference (shortcuts added minus edges removed) plus contracted-neighbour count."""
+    removed = sum(1 for x in out_edges[v] if not contracted[x]) + sum(1 for u in in_edges[v] if not contracted[u])
+    added = len(_shortcuts_for(v, out_edges, in_edges, contracted, max_settled))
+    return added - removed + deleted_neighbors[v]
+
+def build_hierarchy(cg, progress=None, progress_every=1000, max_settled=64):
+    """
+    Contract every node of `cg` and return a ContractionHierarchy. Nodes are ordered lazily
+    by edge difference. `progress(done, total, elapsed_seconds)` is called every
+    progress_every contractions and once at the end. The timing and size summary is kept
+    in hierarchy.report.
+    """
+    start_time = time.perf_counter()
+    n = len(cg)
+    # Working adjacency: out_edges[u][x] = (weight, middle node or -1)
+    out_edges = [{} for _ in range(n)]
+    in_edges = [{} for _ in range(n)]
+    for u in range(n):
+        for i in range(cg.offsets[u], cg.offsets[u + 1]):
+            x, weight = cg.targets[i], cg.weights[i]
+            if x != u and weight < out_edges[u].get(x, (math.inf,))[0]:
+                out_edges[u][x] = (weight, -1)
+                in_edges[x][u] = (weight, -1)
+
+    contracted = [False] * n
+    deleted_neighbors = [0] * n
+    rank = array('q', [0] * n)
+    up = [None] * n
+    down = [None] * n
+    shortcut_count = 0
+
+    queue = [(_priority(v, out_edges, in_edges, contracted, deleted_neighbors, max_settled), v) for v in range(n)]
+    heapq.heapify(queue)
+    order = 0
+    while queue:
+        _, v = heapq.heappop(queue)
+        if contracted[v]:
+            continue
+        # Lazy update: re-evaluate and only contract v if it is still the cheapest
+        priority = _priority(v, out_edges, in_edges, contracted, deleted_neighbors, max_settled)
+        if queue and priority > queue[0][0]:
+            heapq.heappush(queue, (priority, v))
+            continue
+
+        for u, x, via in _shortcuts_for(v, out_edges, in_edges, contracted, max_settled):
+            if via < out_edges[u].get(x, (math.inf,))[0]:
+                out_edges[u][x] = (via, v)
+                in_edges[x][u] = (via, v)
+                shortcut_count += 1
+
+        # Edges to the not yet contracted neighbours are the ones the query walks upward
+        up[v] = [(x, w, mid) for x, (w, mid) in out_edges[v].items() if not contracted[x]]
+        down[v] = [(u, w, mid) for u, (w, mid) in in_edges[v].items() if not contracted[u]]
+        for x, _, _ in up[v]:
+            deleted_neighbors[x] += 1
+        for u, _, _ in down[v]:
+            deleted_neighbors[u] += 1
+        contracted[v] = True
+        rank[v] = order
+        order += 1
+        if progress is not None and order % progress_every == 0:
+            progress(order, n, time.perf_counter() - start_time)
+
+    elapsed = time.perf_counter() - start_time
+    if progress is not None:
+        progress(n, n, elapsed)
+    report = {
+        "nodes": n,
+        "edges": cg.edge_count,
+        "shortcuts": shortcut_count,
+        "elapsed_time": elapsed,
+    }
+    return ContractionHierarchy(cg.fingerprint(), rank, _pack(up, typecode(cg.weights)), _pack(down, typecode(cg.weights)), report)
+
+def _pack(adjacency, weight_typecode):
+    """Turn per-node [(node, weight, middle), ...] lists into CSR arrays."""
+    offsets = array('q', [0])
+    targets = array('q')
+    weights = array(weight_typecode)
+    middle = array('q')
+    for edges in adjacency:
+        for node, weight, mid in edges or ():
+            targets.append(node)
+            weights.append(weight)
+            middle.append(mid)
+        offsets.append(len(targets))
+    return offsets, targets, weights, middle
+
+def ch_search(cg, start_id, goal_id, stats=None, hierarchy=None):
+    """
+    CH query: upward Dijkstra from start and from goal, alternating, each side stopping
+    once its smallest key reaches the best meeting cost. The search space is tiny, so
+    costs and parents are kept in dicts rather than arrays sized to the whole graph.
+    Uses (and if needed builds) the hierarchy cached on cg.
+    """
+    if hierarchy is None:
+        hierarchy = cg.cache.get("ch")
+        if hierarchy is None:
+            hierarchy = cg.cache["ch"] = build_hierarchy(cg)
+    sides = (
+        (hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_weights),
+        (hierarchy.down_offsets, hierarchy.down_targets, hierarchy.down_weights),
+    )
+    costs = ({start_id: 0}, {goal_id: 0})
+    parents = ({start_id: -1}, {goal_id: -1})
+    frontiers = ([(0, start_id)], [(0, goal_id)])
+    track_frontier = stats is not None and stats.counting
+
+    best_cost = 0 if start_id == goal_id else math.inf
+    meeting_node = start_id if start_id == goal_id else -1
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+    side = 0
+    while True:
+        # A side is finished when empty or when nothing on it can improve best_cost
+        active = [s for s in (0, 1) if frontiers[s] and frontiers[s][0][0] < best_cost]
+        if not active:
+            break
+        if track_frontier and len(frontiers[0]) + len(frontiers[1]) > max_frontier:
+            max_frontier = len(frontiers[0]) + len(frontiers[1])
+        side = active[0] if len(active) == 1 else 1 - side
+        offsets, targets, weights = sides[side]
+        frontier, cost_so_far, parent = frontiers[side], costs[side], parents[side]
+        other_cost = costs[1 - side]
+
+        current_cost, current = heapq.heappop(frontier)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+        through = current_cost + other_cost.get(current, math.inf)
+        if through < best_cost:
+            best_cost = through
+            meeting_node = current
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far.get(node, math.inf):
+                cost_so_far[node] = new_cost
+                parent[node] = current
+                heapq.heappush(frontier, (new_cost, node))
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, len(frontiers[0]) + len(frontiers[1]), max_frontier, initial_pushes=2)
+    if meeting_node == -1 or best_cost >= CLOSED:
+        return None, None, nodes_visited
+    path = []
+    current = meeting_node
+    while current != -1:
+        path.append(current)
+        current = parents[0][current]
+    path.reverse()
+    current = parents[1][meeting_node]
+    while current != -1:
+        path.append(current)
+        current = parents[1][current]
+    return hierarchy.unpack(path), best_cost, nodes_visited
+
+if __name__ == "__main__":
+    # Preprocess the built-in map and save the hierarchy: python contraction.py [output.ch]
+    import sys
+    from router import Router
+
+    output = sys.argv[1] if len(sys.argv) > 1 else "graph.ch"
+
+    def report_progress(done, total, elapsed):
+        print(f"Contracted {done}/{total} nodes ({elapsed:.2f} s)")
+
+    hierarchy = Router().build_hierarchy(output, report_progress)
+    summary = hierarchy.report
+    print(f"Built hierarchy: {summary['nodes']} nodes, {summary['edges']} edges, {summary['shortcuts']} shortcuts in {summary['elapsed_time']:.2f} s")
+    print(f"Saved to {output}")
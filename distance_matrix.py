@@ -0,0 +1,145 @@
+import math
+import mmap
+import struct
+import time
+from compiled_graph import CLOSED
+from search import shortest_path_tree
+
+# All-pairs distance and next-hop matrices stored in one binary file that is opened with
+# mmap, so a lookup only touches the page it needs and nothing is parsed or copied at load.
+#
+# Layout (little-endian):
+#   header     magic "CSDM", format version, node count n, graph fingerprint, names length
+#   names      UTF-8 node names joined by "\n", padded to a multiple of 8 bytes
+#   distances  n * n float64, row = source, column = target, inf when unreachable
+#   next hops  n * n int32, first node after the source on the shortest path, -1 if none
+#
+# The fingerprint is CompiledGraph.fingerprint(), so a matrix built before an
+# add_node/remove_node is detected as stale when it is opened for the edited graph.
+
+MAGIC = b"CSDM"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHxxQ40sQ")
+
+def _padded(size):
+    return (size + 7) // 8 * 8
+
+def build_distance_matrix(cg, path, progress=None):
+    """
+    Run one Dijkstra per node and write the distance and next-hop matrices to `path`.
+    Rows are written straight into the memory-mapped file, so the matrices are never
+    held in memory as a whole. `progress(done, total, elapsed_seconds)` is called per row.
+    """
+    start_time = time.perf_counter()
+    n = len(cg)
+    names = "\n".join(map(str, cg.names)).encode("utf-8")
+    names_size = _padded(len(names))
+    data_start = HEADER.size + names_size
+    distances_size = 8 * n * n
+    total_size = data_start + distances_size + 4 * n * n
+
+    with open(path, "w+b") as f:
+        f.truncate(max(total_size, 1))
+        with mmap.mmap(f.fileno(), total_size) as mm:
+            mm[:HEADER.size] = HEADER.pack(MAGIC, FORMAT_VERSION, n, cg.fingerprint().encode("ascii"), len(names))
+            mm[HEADER.size:HEADER.size + len(names)] = names
+            distances = memoryview(mm)[data_start:data_start + distances_size].cast("d")
+            next_hops = memoryview(mm)[data_start + distances_size:total_size].cast("i")
+            for source in range(n):
+                cost_so_far, parent = shortest_path_tree(cg, source)
+                # A node's first hop is its parent's first hop; visiting nodes in cost
+                # order guarantees the parent has already been handled
+                first_hop = [-1] * n
+                for node in sorted((v for v in range(n) if cost_so_far[v] < CLOSED and v != source), key=cost_so_far.__getitem__):
+                    p = parent[node]
+                    first_hop[node] = node if p == source else first_hop[p]
+                row = source * n
+                for target in range(n):
+                    distances[row + target] = cost_so_far[target] if cost_so_far[target] < CLOSED else math.inf
+                    next_hops[row + target] = first_hop[target]
+                if progress is not None:
+                    progress(source + 1, n, time.perf_counter() - start_time)
+            distances.release()
+            next_hops.release()
+            mm.flush()
+
+class DistanceMatrix:
+    """
+    Read-only view of a file written by build_distance_matrix(). Opening only parses the
+    header and names; distance() is O(1) and path() is O(path length).
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, fingerprint, names_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a distance matrix file.")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported distance matrix format version {version}.")
+        self.fingerprint = fingerprint.decode("ascii")
+        raw_names = self._mmap[HEADER.size:HEADER.size + names_length].decode("utf-8")
+        self.names = raw_names.split("\n") if n else []
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        data_start = HEADER.size + _padded(names_length)
+        distances_size = 8 * n * n
+        self._distances = memoryview(self._mmap)[data_start:data_start + distances_size].cast("d")
+        self._next_hops = memoryview(self._mmap)[data_start + distances_size:data_start + distances_size + 4 * n * n].cast("i")
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def is_stale(self, cg):
+        """True if the matrix was built for a different version of the graph."""
+        return self.fingerprint != cg.fingerprint()
+
+    def distance(self, start, goal):
+        """Shortest path cost between two node names (math.inf if unreachable)."""
+        return self._distances[self.ids[start] * self.n + self.ids[goal]]
+
+    def path(self, start, goal):
+        """Shortest path between two node names as a list of names, or None if unreachable."""
+        current, goal_id = self.ids[start], self.ids[goal]
+        path = [current]
+        while current != goal_id:
+            current = self._next_hops[current * self.n + goal_id]
+            if current == -1:
+                return None
+            path.append(current)
+        return [self.names[i] for i in path]
+
+    def close(self):
+        for view in ("_distances", "_next_hops"):
+            if getattr(self, view, None) is not None:
+                getattr(self, view).release()
+                setattr(self, view, None)
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_distance_matrix(path, cg):
+    """Open a matrix file for `cg`; raises ValueError if it is stale for this graph."""
+    matrix = DistanceMatrix(path)
+    if matrix.is_stale(cg):
+        matrix.close()
+        raise ValueError("Distance matrix was built for a different graph; rebuild it with build_distance_matrix().")
+    return matrix
+
+if __name__ == "__main__":
+    # Precompute the matrix for the built-in map: python distance_matrix.py [output.dm]
+    import sys
+    from router import Router
+
+    output = sys.argv[1] if len(sys.argv) > 1 else "graph.dm"
+    cg = Router().compiled
+    started = time.perf_counter()
+    build_distance_matrix(cg, output)
+    print(f"Wrote {len(cg)}x{len(cg)} distance matrix to {output} in {time.perf_counter() - started:.2f} s")
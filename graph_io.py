@@ -0,0 +1,425 @@
+import csv
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from compiled_graph import CLOSED, CompiledGraph, compile_graph, typecode
+from heuristics import haversine_meters
+from spatial_index import GridIndex
+
+# Loaders and savers for maps kept outside the source code. Every loader returns
+# (graph, coordinates, non_eatery_nodes) in the same shape as campus_map.py, ready to be
+# passed to Router(...). Inputs are read row by row / element by element rather than
+# being collected into intermediate lists first.
+
+# OSM amenity values that count as eateries
+OSM_EATERY_AMENITIES = {"restaurant", "fast_food", "cafe", "food_court", "bar", "pub", "ice_cream"}
+
+TRUE_VALUES = {"1", "y", "yes", "true", "t"}
+
+def _add_edge(graph, source, target, cost, oneway=False):
+    graph.setdefault(source, {})[target] = cost
+    graph.setdefault(target, {})
+    if not oneway:
+        graph[target][source] = cost
+
+def _flag(value, default):
+    """
+    Read a yes/no property the same way for every format: strings by TRUE_VALUES, other
+    values (JSON booleans and numbers) by truth, and missing or empty values as default.
+    """
+    if value is None or value == "":
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+def _number(value):
+    """Parse an edge cost, keeping whole numbers as ints like the built-in map."""
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+def load_csv(nodes_path, edges_path):
+    """
+    Load a map from two CSV files with header rows:
+      nodes: name,lat,lon[,eatery]   eatery is yes/no (default yes)
+      edges: source,target,cost[,oneway]   oneway is yes/no (default no)
+    """
+    graph = {}
+    coordinates = {}
+    non_eatery_nodes = set()
+    with open(nodes_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = row["name"].strip()
+            graph.setdefault(name, {})
+            coordinates[name] = (float(row["lat"]), float(row["lon"]))
+            if not _flag(row.get("eatery"), True):
+                non_eatery_nodes.add(name)
+    with open(edges_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            oneway = _flag(row.get("oneway"), False)
+            _add_edge(graph, row["source"].strip(), row["target"].strip(), _number(row["cost"]), oneway)
+    return graph, coordinates, non_eatery_nodes
+
+def _geojson_features(f):
+    """
+    Yield features from a FeatureCollection, or one per line from newline-delimited
+    GeoJSON (read line by line, so very large files never sit in memory whole).
+    """
+    first = f.readline()
+    try:
+        feature = json.loads(first.strip().lstrip("\x1e"))
+    except ValueError:
+        feature = None
+    if isinstance(feature, dict) and feature.get("type") == "Feature":
+        yield feature
+        for line in f:
+            line = line.strip().lstrip("\x1e") # Also accept RFC 8142 text sequences
+            if line:
+                yield json.loads(line)
+        return
+    document = json.loads(first + f.read())
+    yield from document.get("features", [])
+
+def load_geojson(path):
+    """
+    Load a map from GeoJSON. Point features are nodes (properties: name, eatery).
+    LineString features are edges: with "source"/"target" properties they join those
+    named nodes (cost from "cost", else the line length in meters); otherwise they
+    join consecutive vertices, matched to Point nodes by exact position or named
+    "lat,lon" when no Point sits there. "oneway": true makes an edge directed. Flags
+    may be booleans or the same yes/no strings as in CSV files.
+    Coordinates follow GeoJSON order, [lon, lat].
+    """
+    graph = {}
+    coordinates = {}
+    non_eatery_nodes = set()
+    by_position = {}
+    pending_lines = []
+
+    def vertex_name(lon, lat):
+        name = by_position.get((lat, lon))
+        if name is None:
+            name = by_position[(lat, lon)] = f"{lat},{lon}"
+            graph.setdefault(name, {})
+            coordinates[name] = (lat, lon)
+            non_eatery_nodes.add(name)
+        return name
+
+    def add_line(properties, points):
+        oneway = _flag(properties.get("oneway"), False)
+        if "source" in properties and "target" in properties:
+            cost = properties.get("cost")
+            if cost is None:
+                cost = round(sum(haversine_meters(a[1], a[0], b[1], b[0]) for a, b in zip(points, points[1:])))
+            _add_edge(graph, properties["source"], properties["target"], _number(cost), oneway)
+            return
+        names = [vertex_name(lon, lat) for lon, lat, *_ in points]
+        for (a, pa), (b, pb) in zip(zip(names, points), zip(names[1:], points[1:])):
+            if a != b:
+                _add_edge(graph, a, b, round(haversine_meters(pa[1], pa[0], pb[1], pb[0])), oneway)
+
+    with open(path, encoding="utf-8") as f:
+        for feature in _geojson_features(f):
+            geometry = feature.get("geometry") or {}
+            properties = feature.get("properties") or {}
+            kind = geometry.get("type")
+            if kind == "Point":
+                lon, lat = geometry["coordinates"][:2]
+                name = properties.get("name") or f"{lat},{lon}"
+                graph.setdefault(name, {})
+                coordinates[name] = (lat, lon)
+                by_position[(lat, lon)] = name
+                if not _flag(properties.get("eatery"), True):
+                    non_eatery_nodes.add(name)
+            elif kind in ("LineString", "MultiLineString"):
+                lines = [geometry["coordinates"]] if kind == "LineString" else geometry["coordinates"]
+                for points in lines:
+                    if "source" in properties:
+                        add_line(properties, points)
+                    else:
+                        # Points may come later in the file; match vertices once all are known
+                        pending_lines.append((properties, points))
+    for properties, points in pending_lines:
+        add_line(properties, points)
+    return graph, coordinates, non_eatery_nodes
+
+def load_osm(path):
+    """
+    Load the walkable ways of an OSM XML extract (.osm). Every way tagged "highway"
+    becomes edges between consecutive nodes, costed in meters; "oneway=yes" is kept
+    directed unless the way is a footway. Eatery amenity nodes are eateries; those that
+    are not on a way are linked to the nearest way node (see _osm_map for node names).
+    The file is parsed incrementally and every element is freed as soon as it is read.
+    """
+    import xml.etree.ElementTree as ElementTree
+    positions = {} # OSM node id -> (lat, lon)
+    node_names = {} # OSM node id -> name tag
+    eateries = set()
+    graph = {} # Keyed by OSM node id until _osm_map names the nodes
+
+    events = ElementTree.iterparse(path, events=("start", "end"))
+    _, root = next(events)
+    for event, element in events:
+        if event != "end":
+            continue
+        if element.tag == "node":
+            osm_id = element.get("id")
+            positions[osm_id] = (float(element.get("lat")), float(element.get("lon")))
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            if "name" in tags:
+                node_names[osm_id] = tags["name"]
+            if tags.get("amenity") in OSM_EATERY_AMENITIES:
+                eateries.add(osm_id)
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            if "highway" in tags:
+                refs = [nd.get("ref") for nd in element.iter("nd")]
+                oneway = tags.get("oneway") in ("yes", "1", "true") and tags["highway"] not in ("footway", "pedestrian", "path")
+                _add_osm_way(graph, positions, refs, oneway)
+        elif element.tag != "relation":
+            continue
+        # Children were read with their parent; the root would otherwise keep every
+        # finished element alive
+        root.clear()
+    return _osm_map(graph, positions, node_names, eateries)
+
+def _add_osm_way(graph, positions, refs, oneway):
+    refs = [ref for ref in refs if ref in positions]
+    for a, b in zip(refs, refs[1:]):
+        cost = round(haversine_meters(*positions[a], *positions[b]))
+        _add_edge(graph, a, b, max(cost, 1), oneway)
+
+def _osm_map(graph, positions, node_names, eateries):
+    """
+    Finish an OSM import from `graph` keyed by OSM node id. Eatery nodes outside the
+    ways get a two-way edge to the nearest way node. Nodes are then named for display:
+    by their name tag, with " (<id>)" added when several nodes share the name, or
+    "node <id>" when unnamed. Names never merge nodes, since edges were built on ids.
+    """
+    standalone = [osm_id for osm_id in eateries if osm_id not in graph]
+    if standalone and graph:
+        index = GridIndex({osm_id: positions[osm_id] for osm_id in graph})
+        for osm_id in standalone:
+            _, nearest = index.nearest(*positions[osm_id])[0]
+            cost = round(haversine_meters(*positions[osm_id], *positions[nearest]))
+            _add_edge(graph, osm_id, nearest, max(cost, 1))
+
+    uses = {}
+    for osm_id in graph:
+        if osm_id in node_names:
+            uses[node_names[osm_id]] = uses.get(node_names[osm_id], 0) + 1
+    def display(osm_id):
+        name = node_names.get(osm_id)
+        if name is None:
+            return f"node {osm_id}"
+        return name if uses[name] == 1 else f"{name} ({osm_id})"
+    names = {osm_id: display(osm_id) for osm_id in graph}
+
+    named_graph = {}
+    coordinates = {}
+    non_eatery_nodes = set()
+    for osm_id in list(graph):
+        name = names[osm_id]
+        named_graph[name] = {names[neighbor]: cost for neighbor, cost in graph.pop(osm_id).items()}
+        coordinates[name] = positions[osm_id]
+        if osm_id not in eateries:
+            non_eatery_nodes.add(name)
+    return named_graph, coordinates, non_eatery_nodes
+
+def load_osm_pbf(path):
+    """
+    Load an OSM PBF extract like load_osm(). Decoding PBF needs the optional pyosmium
+    package (pip install osmium); convert the extract to .osm XML instead to avoid it.
+    """
+    try:
+        import osmium
+    except ImportError:
+        raise ImportError("Reading .osm.pbf files requires pyosmium (pip install osmium), or convert the extract to .osm XML.")
+    positions = {}
+    node_names = {}
+    eateries = set()
+    graph = {}
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, n):
+            positions[str(n.id)] = (n.location.lat, n.location.lon)
+            if "name" in n.tags:
+                node_names[str(n.id)] = n.tags["name"]
+            if n.tags.get("amenity") in OSM_EATERY_AMENITIES:
+                eateries.add(str(n.id))
+
+        def way(self, w):
+            if "highway" not in w.tags:
+                return
+            oneway = w.tags.get("oneway") in ("yes", "1", "true") and w.tags["highway"] not in ("footway", "pedestrian", "path")
+            _add_osm_way(graph, positions, [str(nd.ref) for nd in w.nodes], oneway)
+
+    Handler().apply_file(path)
+    return _osm_map(graph, positions, node_names, eateries)
+
+# Binary snapshot layout (native byte order, checked with a byte-order mark):
+#   header   magic "CSGS", version, byte-order mark, weight typecode, node count, edge count, names length
+#   names    UTF-8 node names joined by "\n" (so names cannot contain a line break)
+#   eatery   one byte per node, 1 for eateries
+#   lat, lon float64 per node (NaN when unknown)
+#   offsets  int64 per node + 1, then targets int64 and weights (int64 or float64) per edge
+SNAPSHOT_MAGIC = b"CSGS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("=4sHHcxQQQ")
+BYTE_ORDER_MARK = 0x0102
+# Extensions load_map() reads with a parser; every other file is taken as a snapshot
+MAP_EXTENSIONS = (".csv", ".geojson", ".json", ".osm", ".pbf")
+
+def is_snapshot(path):
+    return not path.lower().endswith(MAP_EXTENSIONS)
+
+def save_snapshot(path, cg, non_eatery_nodes):
+    """
+    Write a compiled map as a compact binary snapshot (see load_snapshot). Eatery flags
+    come from cg.eatery when it is set, otherwise from non_eatery_nodes. cg may also be
+    a map_snapshot(), whose arrays are memoryviews. Raises ValueError for a node name
+    with a line break, which would split into two names when loaded.
+    """
+    names = "\n".join(cg.names)
+    if names.count("\n") != max(len(cg) - 1, 0):
+        name = next(name for name in cg.names if "\n" in name)
+        raise ValueError(f"Node name {name!r} contains a line break, which snapshots cannot store.")
+    names = names.encode("utf-8")
+    if cg.eatery is not None:
+        eatery = bytes(cg.eatery)
+    else:
+        eatery = bytes(0 if name in non_eatery_nodes else 1 for name in cg.names)
+    with open(path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, BYTE_ORDER_MARK, typecode(cg.weights).encode("ascii"), len(cg), cg.edge_count, len(names)))
+        f.write(names)
+        f.write(eatery)
+        for values in (cg.lat, cg.lon, cg.offsets, cg.targets, cg.weights):
+            f.write(values) # Arrays and memoryviews both write their raw bytes
+
+def _snapshot_header(path, header):
+    magic, version, mark, typecode, n, m, names_length = SNAPSHOT_HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"'{path}' is not a map snapshot.")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}.")
+    if mark != BYTE_ORDER_MARK:
+        raise ValueError("Snapshot was written on a machine with a different byte order.")
+    return typecode, n, m, names_length
+
+def load_snapshot(path):
+    """
+    Read a snapshot written by save_snapshot() and return its CompiledGraph, straight
+    from the packed arrays, with the eatery flags in cg.eatery. Nothing is converted
+    per node; snapshot_graph() and friends build the dict views when they are needed.
+    """
+    with open(path, "rb") as f:
+        typecode, n, m, names_length = _snapshot_header(path, f.read(SNAPSHOT_HEADER.size))
+        names = f.read(names_length).decode("utf-8").split("\n") if n else []
+        if len(names) != n:
+            raise ValueError(f"'{path}' is corrupt: it has {len(names)} names for {n} nodes.")
+        eatery = f.read(n)
+        arrays = []
+        for code, count in (('d', n), ('d', n), ('q', n + 1), ('q', m), (typecode.decode("ascii"), m)):
+            values = array(code)
+            values.fromfile(f, count)
+            arrays.append(values)
+    lat, lon, offsets, targets, weights = arrays
+    return CompiledGraph(names, offsets, targets, weights, lat, lon, eatery=eatery)
+
+class _MappedNames:
+    """Read-only list of the node names of a mapped snapshot, decoded one at a time."""
+
+    def __init__(self, mapping, start, length, n):
+        self._mapping = mapping
+        self._start = start
+        self._ends = array('q') # End of each name in the mapping
+        end = start + length
+        position = start
+        for _ in range(n - 1):
+            position = mapping.find(b"\n", position, end)
+            if position == -1:
+                raise ValueError("Corrupt snapshot: fewer names than nodes.")
+            self._ends.append(position)
+            position += 1
+        if n:
+            if mapping.find(b"\n", position, end) != -1:
+                raise ValueError("Corrupt snapshot: more names than nodes.")
+            self._ends.append(end)
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, i):
+        begin = self._ends[i - 1] + 1 if i else self._start
+        return self._mapping[begin:self._ends[i]].decode("utf-8")
+
+def map_snapshot(path):
+    """
+    Like load_snapshot(), but the arrays are memoryviews into a read-only mmap of the
+    file and names are decoded on access, so a map larger than memory can be read in
+    passes (see tiled_graph.build_tiles). cg.ids is left empty: there is no name lookup.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    typecode, n, m, names_length = _snapshot_header(path, mapping[:SNAPSHOT_HEADER.size])
+    position = SNAPSHOT_HEADER.size
+    names = _MappedNames(mapping, position, names_length, n)
+    position += names_length
+    view = memoryview(mapping)
+    eatery = view[position:position + n]
+    position += n
+    arrays = []
+    for code, count in (('d', n), ('d', n), ('q', n + 1), ('q', m), (typecode.decode("ascii"), m)):
+        arrays.append(view[position:position + 8 * count].cast(code))
+        position += 8 * count
+    lat, lon, offsets, targets, weights = arrays
+    return CompiledGraph(names, offsets, targets, weights, lat, lon, ids={}, eatery=eatery)
+
+def snapshot_graph(cg):
+    """The dict-of-dicts graph of a loaded snapshot; closed edges cost math.inf again."""
+    names, offsets, targets, weights = cg.names, cg.offsets, cg.targets, cg.weights
+    graph = {}
+    for i, name in enumerate(names):
+        lo, hi = offsets[i], offsets[i + 1]
+        graph[name] = {names[t]: (w if w != CLOSED else math.inf) for t, w in zip(targets[lo:hi], weights[lo:hi])}
+    return graph
+
+def snapshot_coordinates(cg):
+    """{name: (lat, lon)} of a loaded snapshot, leaving out nodes without a position."""
+    return {name: (lat, lon) for name, lat, lon in zip(cg.names, cg.lat, cg.lon) if lat == lat} # Not NaN
+
+def snapshot_non_eatery_nodes(cg):
+    """Names of the nodes a loaded snapshot does not flag as eateries."""
+    return {name for name, eatery in zip(cg.names, cg.eatery) if not eatery}
+
+def load_map(path, edges_path=None):
+    """
+    Load a map by file extension: .csv (nodes file, plus edges_path), .geojson/.json,
+    .osm, .pbf, or a snapshot (anything else). Returns (graph, coordinates, non_eatery_nodes).
+    """
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        if edges_path is None:
+            raise ValueError("CSV maps need both a nodes file and an edges file.")
+        return load_csv(path, edges_path)
+    if lower.endswith((".geojson", ".json")):
+        return load_geojson(path)
+    if lower.endswith(".osm"):
+        return load_osm(path)
+    if lower.endswith(".pbf"):
+        return load_osm_pbf(path)
+    cg = load_snapshot(path)
+    return snapshot_graph(cg), snapshot_coordinates(cg), snapshot_non_eatery_nodes(cg)
+
+if __name__ == "__main__":
+    # Convert a map file to a snapshot: python graph_io.py input [edges.csv] output.snapshot
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python graph_io.py <map file> [<edges.csv>] <output snapshot>")
+        sys.exit(1)
+    graph, coordinates, non_eatery_nodes = load_map(sys.argv[1], sys.argv[2] if len(sys.argv) == 4 else None)
+    cg = compile_graph(graph, coordinates)
+    save_snapshot(sys.argv[-1], cg, non_eatery_nodes)
+    print(f"Saved {len(cg)} nodes to {sys.argv[-1]}")
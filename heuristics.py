@@ -0,0 +1,179 @@
+import math
+from array import array
+from collections import OrderedDict
+
+# Heuristics for a_star. A heuristic's for_goal(cg, goal_id) returns a function
+# h(node_id) estimating the remaining cost to the goal in the same units as the edge
+# weights (meters on the campus map). All of them are admissible and consistent, so
+# A* still returns optimal paths. Data that depends only on the graph is cached in
+# cg.cache and is rebuilt automatically when the graph is recompiled after an edit.
+
+EARTH_RADIUS_METERS = 6371008.8
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two (lat, lon) points given in degrees."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(1.0, a)))
+
+def equirectangular_meters(lat1, lon1, lat2, lon2):
+    """Flat-earth approximation of haversine_meters; accurate over campus and city distances."""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_METERS * math.hypot(x, y)
+
+METRICS = {
+    "haversine": haversine_meters,
+    "equirectangular": equirectangular_meters,
+}
+
+class ZeroHeuristic:
+    """h = 0 everywhere; A* with it behaves exactly like UCS."""
+    name = "zero"
+
+    def for_goal(self, cg, goal_id):
+        return lambda node_id: 0
+
+class GeoHeuristic:
+    """
+    Straight-line distance to the goal, multiplied by `scale` to convert to edge-weight units.
+    With scale=None the scale is calibrated from the graph as the smallest weight/distance
+    ratio over all edges (capped at 1), which keeps the heuristic consistent even when some
+    edge costs are slightly shorter than the straight-line distance between their endpoints.
+    Nodes without coordinates get h = 0.
+    """
+
+    def __init__(self, metric="haversine", scale=None):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Choose from: {', '.join(METRICS)}")
+        self.metric = metric
+        self.scale = scale
+        self.name = metric
+
+    def calibrated_scale(self, cg):
+        key = ("geo_scale", self.metric)
+        scale = cg.cache.get(key)
+        if scale is None:
+            distance = METRICS[self.metric]
+            lat, lon = cg.lat, cg.lon
+            scale = 1.0
+            for node in range(len(cg)):
+                for i in range(cg.offsets[node], cg.offsets[node + 1]):
+                    target = cg.targets[i]
+                    meters = distance(lat[node], lon[node], lat[target], lon[target])
+                    if meters > 0 and not math.isnan(meters):
+                        scale = min(scale, cg.weights[i] / meters)
+            cg.cache[key] = scale
+        return scale
+
+    def for_goal(self, cg, goal_id):
+        scale = self.scale if self.scale is not None else self.calibrated_scale(cg)
+        distance = METRICS[self.metric]
+        lat, lon = cg.lat, cg.lon
+        goal_lat, goal_lon = lat[goal_id], lon[goal_id]
+        if math.isnan(goal_lat) or math.isnan(goal_lon):
+            return lambda node_id: 0
+
+        def h(node_id):
+            meters = distance(lat[node_id], lon[node_id], goal_lat, goal_lon)
+            return 0 if math.isnan(meters) else scale * meters
+        return h
+
+class TableHeuristic:
+    """
+    Wraps another heuristic and precomputes its value for every node once per goal.
+    The last `cache_size` goal tables are kept (LRU), so repeated queries to popular
+    goals only pay a list lookup per relaxation.
+    """
+
+    def __init__(self, base=None, cache_size=32):
+        self.base = base if base is not None else GeoHeuristic()
+        self.cache_size = cache_size
+        self.name = f"table-{self.base.name}"
+
+    def for_goal(self, cg, goal_id):
+        tables = cg.cache.setdefault(("goal_tables", id(self)), OrderedDict())
+        table = tables.get(goal_id)
+        if table is None:
+            h = self.base.for_goal(cg, goal_id)
+            table = array('d', (h(node) for node in range(len(cg))))
+            tables[goal_id] = table
+            if len(tables) > self.cache_size:
+                tables.popitem(last=False)
+        else:
+            tables.move_to_end(goal_id)
+        return table.__getitem__
+
+class LandmarkHeuristic:
+    """
+    ALT (A*, landmarks, triangle inequality). For each landmark L the exact distances
+    d(L, v) and d(v, L) are precomputed; then for any node v and goal t
+        d(v, t) >= max(d(L, t) - d(L, v), d(v, L) - d(t, L))
+    which is a much tighter bound than straight-line distance on road-like graphs.
+    Landmarks are chosen by farthest-point selection so they sit on the edges of the map.
+    """
+    name = "alt"
+
+    def __init__(self, count=8):
+        self.count = count
+
+    def select_landmarks(self, cg):
+        """Pick up to `count` landmarks, each as far (by path cost) as possible from the previous ones."""
+        from search import shortest_path_tree
+        n = len(cg)
+        if n == 0:
+            return []
+        # Start from the node farthest from node 0 rather than node 0 itself
+        dist, _ = shortest_path_tree(cg, 0)
+        landmarks = [max(range(n), key=lambda v: dist[v] if dist[v] != math.inf else -1)]
+        nearest = [math.inf] * n
+        while len(landmarks) < min(self.count, n):
+            dist, _ = shortest_path_tree(cg, landmarks[-1])
+            for v in range(n):
+                if dist[v] < nearest[v]:
+                    nearest[v] = dist[v]
+            # Unreachable nodes (other components) count as infinitely far, so they get a landmark too
+            candidate = max(range(n), key=lambda v: nearest[v])
+            if nearest[candidate] == 0:
+                break
+            landmarks.append(candidate)
+        return landmarks
+
+    def tables(self, cg):
+        """Return (landmarks, from_tables, to_tables), computing and caching them on first use."""
+        key = ("alt", self.count)
+        cached = cg.cache.get(key)
+        if cached is None:
+            from search import shortest_path_tree
+            landmarks = self.select_landmarks(cg)
+            reverse = cg.reversed()
+            from_tables = [array('d', shortest_path_tree(cg, landmark)[0]) for landmark in landmarks]
+            to_tables = [array('d', shortest_path_tree(reverse, landmark)[0]) for landmark in landmarks]
+            cached = cg.cache[key] = (landmarks, from_tables, to_tables)
+        return cached
+
+    def for_goal(self, cg, goal_id):
+        landmarks, from_tables, to_tables = self.tables(cg)
+        # Read the goal's distances once so h only has to index the node's
+        pairs = []
+        for from_table, to_table in zip(from_tables, to_tables):
+            from_goal = from_table[goal_id]
+            to_goal = to_table[goal_id]
+            pairs.append((from_table, from_goal, to_table, to_goal))
+
+        def h(node_id):
+            best = 0
+            for from_table, from_goal, to_table, to_goal in pairs:
+                from_node = from_table[node_id]
+                if from_goal != math.inf and from_node != math.inf:
+                    bound = from_goal - from_node
+                    if bound > best:
+                        best = bound
+                to_node = to_table[node_id]
+                if to_node != math.inf and to_goal != math.inf:
+                    bound = to_node - to_goal
+                    if bound > best:
+                        best = bound
+            return best
+        return h
@@ -0,0 +1,99 @@
+import json
+import time # For timing
+import tracemalloc # For memory usage
+
+# Instrumentation levels for a search
+OFF = "off"            # Only timing and nodes visited; nothing extra in the search loop
+COUNTERS = "counters"  # Heap and relaxation counters (one cheap check per pop)
+DEEP = "deep"          # Counters plus tracemalloc peak memory (slows the search severalfold)
+LEVELS = (OFF, COUNTERS, DEEP)
+
+class SearchStats:
+    """
+    Structured statistics for one search. Create one with the wanted level and pass it
+    to Router.search(); the search fills it in. Fields that a level does not collect stay None.
+    """
+
+    def __init__(self, level=OFF):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown instrumentation level '{level}'. Choose from: {', '.join(LEVELS)}")
+        self.level = level
+        self.algorithm = None
+        self.elapsed_time = None
+        self.nodes_visited = None  # Settled (expanded) nodes
+        self.pushes = None
+        self.pops = None
+        self.stale_pops = None     # Pops of an entry superseded by a cheaper one
+        self.relaxations = None    # Edge relaxations that improved a cost
+        self.max_frontier = None
+        self.peak_memory = None    # Bytes, DEEP only
+        self.cache_hit = None      # True when Router answered from its route cache
+
+    @property
+    def counting(self):
+        return self.level != OFF
+
+    def start(self):
+        """Begin timing (and memory tracing in DEEP mode) just before the search loop."""
+        if self.level == DEEP:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._start_time = time.perf_counter()
+
+    def stop(self):
+        """Stop timing and memory tracing right after the search loop."""
+        self.elapsed_time = time.perf_counter() - self._start_time
+        if self.level == DEEP:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def record(self, nodes_visited, pops, frontier_left, max_frontier=None, initial_pushes=1):
+        """
+        Fill the counters from totals a search loop already keeps. Pushes are not counted in
+        the loop: every pushed entry was either popped or is still on the frontier.
+        """
+        self.nodes_visited = nodes_visited
+        if not self.counting:
+            return
+        self.pops = pops
+        self.stale_pops = pops - nodes_visited
+        self.pushes = pops + frontier_left
+        self.relaxations = self.pushes - initial_pushes
+        self.max_frontier = max_frontier
+
+    def to_dict(self):
+        return {
+            "level": self.level,
+            "algorithm": self.algorithm,
+            "elapsed_time": self.elapsed_time,
+            "nodes_visited": self.nodes_visited,
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "stale_pops": self.stale_pops,
+            "relaxations": self.relaxations,
+            "max_frontier": self.max_frontier,
+            "peak_memory": self.peak_memory,
+            "cache_hit": self.cache_hit,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize(values):
+    """Mean and p50/p95/p99 of a list of measurements (latencies, nodes visited, ...)."""
+    values = sorted(values)
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
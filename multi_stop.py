@@ -0,0 +1,184 @@
+import math
+from compiled_graph import CLOSED
+from instrumentation import COUNTERS, SearchStats
+from search import nearest_targets
+
+# Multi-stop routes ("start here, visit these eateries, end there"). The costs between all
+# the points are found with one Dijkstra per point, stopped as soon as every other point
+# is settled (or read from a DistanceMatrix). The visiting order is then exact for small
+# stop counts (Held-Karp) and heuristic beyond that (nearest insertion, then 2-opt), and
+# the legs are stitched into one path.
+
+# Held-Karp needs 2^m * m table entries and 2^m * m^2 steps for m stops; up to this many
+# stops that stays within about 50k entries and well under a second
+HELD_KARP_LIMIT = 12
+
+def leg_costs(cg, points, matrix=None, stats=None):
+    """
+    Costs and paths between every pair of points (node ids). Returns (cost, legs,
+    nodes_visited): cost[i][j] is the cost from points[i] to points[j] (math.inf if
+    unreachable) and legs(i, j) returns that path as node ids. With a DistanceMatrix
+    for cg, nothing is searched.
+    """
+    n = len(points)
+    if matrix is not None:
+        names = [cg.names[point] for point in points]
+        cost = [[matrix.distance(names[i], names[j]) for j in range(n)] for i in range(n)]
+        return cost, lambda i, j: [cg.ids[name] for name in matrix.path(names[i], names[j])], 0
+
+    cost = [[math.inf] * n for _ in range(n)]
+    paths = {}
+    nodes_visited = 0
+    pops = 0
+    frontier_left = 0
+    max_frontier = 0
+    for i, point in enumerate(points):
+        targets = set(points)
+        leg_stats = SearchStats(COUNTERS) if stats is not None and stats.counting else None
+        found, visited = nearest_targets(cg, point, targets, len(targets), leg_stats)
+        nodes_visited += visited
+        if leg_stats is not None:
+            pops += leg_stats.pops
+            frontier_left += leg_stats.pushes - leg_stats.pops
+            max_frontier = max(max_frontier, leg_stats.max_frontier)
+        for target, target_cost, path_ids in found:
+            for j, other in enumerate(points):
+                if other == target:
+                    cost[i][j] = target_cost
+                    paths[(i, j)] = path_ids
+    if stats is not None:
+        stats.record(nodes_visited, pops, frontier_left, max_frontier, initial_pushes=n)
+    return cost, lambda i, j: paths[(i, j)], nodes_visited
+
+def held_karp(cost, m, end):
+    """
+    Exact cheapest order of stops 1..m starting at point 0, finishing at point `end`
+    (m + 1) or, when end is None, at whichever stop is cheapest. Returns (order, total).
+    """
+    full = (1 << m) - 1
+    best = [[math.inf] * m for _ in range(1 << m)] # best[visited][last]: cost from point 0
+    previous = [[-1] * m for _ in range(1 << m)]
+    for j in range(m):
+        best[1 << j][j] = cost[0][j + 1]
+    for visited in range(1, full + 1):
+        row = best[visited]
+        for last in range(m):
+            here = row[last]
+            if here == math.inf or not visited & (1 << last):
+                continue
+            costs_from = cost[last + 1]
+            for nxt in range(m):
+                bit = 1 << nxt
+                if visited & bit:
+                    continue
+                total = here + costs_from[nxt + 1]
+                if total < best[visited | bit][nxt]:
+                    best[visited | bit][nxt] = total
+                    previous[visited | bit][nxt] = last
+    finish = [best[full][last] + (cost[last + 1][end] if end is not None else 0) for last in range(m)]
+    last = min(range(m), key=finish.__getitem__)
+    total = finish[last]
+    if total >= CLOSED:
+        return list(range(1, m + 1)), total # Some stop cannot be reached in any order
+    order = []
+    visited = full
+    while last != -1:
+        order.append(last + 1)
+        last, visited = previous[visited][last], visited & ~(1 << last)
+    order.reverse()
+    return order, total
+
+def _route_cost(cost, route):
+    return sum(cost[a][b] for a, b in zip(route, route[1:]))
+
+def nearest_insertion(cost, m, end):
+    """
+    Heuristic order of stops 1..m: repeatedly take the stop closest to the route so far
+    and insert it where it adds the least cost. Returns the route of point indexes,
+    starting at 0 and ending at `end` when given.
+    """
+    route = [0] if end is None else [0, end]
+    remaining = set(range(1, m + 1))
+    # Cost between each remaining stop and its closest point on the route (either way)
+    closest = {stop: min(min(cost[point][stop], cost[stop][point]) for point in route) for stop in remaining}
+    while remaining:
+        stop = min(remaining, key=closest.__getitem__)
+        remaining.remove(stop)
+        del closest[stop]
+        # Appending is only allowed when the route has no fixed end
+        best_position = len(route)
+        best_added = cost[route[-1]][stop] if end is None else math.inf
+        for position in range(1, len(route)):
+            a, b = route[position - 1], route[position]
+            added = cost[a][stop] + cost[stop][b] - cost[a][b]
+            if added < best_added:
+                best_position, best_added = position, added
+        route.insert(best_position, stop)
+        for other in remaining:
+            closest[other] = min(closest[other], cost[stop][other], cost[other][stop])
+    return route
+
+def two_opt(cost, route, fixed_end):
+    """
+    Improve a route by reversing segments while that lowers its cost. The first point,
+    and the last one when fixed_end, stay in place. Costs may be asymmetric: a reversed
+    segment is charged its cost in the new direction.
+    """
+    last = len(route) - 1 if fixed_end else len(route)
+    improved = True
+    while improved:
+        improved = False
+        # Prefix sums of the costs along the route, forward and backward
+        forward = [0]
+        backward = [0]
+        for a, b in zip(route, route[1:]):
+            forward.append(forward[-1] + cost[a][b])
+            backward.append(backward[-1] + cost[b][a])
+        for i in range(1, last - 1):
+            for j in range(i + 1, last):
+                # Reverse route[i..j]
+                before = route[i - 1]
+                after = route[j + 1] if j + 1 < len(route) else None
+                old = cost[before][route[i]] + forward[j] - forward[i] + (cost[route[j]][after] if after is not None else 0)
+                new = cost[before][route[j]] + backward[j] - backward[i] + (cost[route[i]][after] if after is not None else 0)
+                if new < old - 1e-9:
+                    route[i:j + 1] = route[i:j + 1][::-1]
+                    improved = True
+                    break
+            if improved:
+                break
+    return route
+
+def plan_stops(cg, start_id, stop_ids, end_id=None, matrix=None, stats=None):
+    """
+    Cheapest route from start_id through every node of stop_ids, finishing at end_id
+    (or at the last stop when end_id is None). Returns (order, path_ids, cost,
+    nodes_visited): order lists the stops in visiting order and path_ids is the stitched
+    path; path_ids and cost are None when some stop cannot be reached. The order is
+    exact for up to HELD_KARP_LIMIT stops.
+    """
+    stops = []
+    for stop in stop_ids:
+        if stop != start_id and stop != end_id and stop not in stops:
+            stops.append(stop)
+    m = len(stops)
+    points = [start_id] + stops + ([end_id] if end_id is not None else [])
+    end = m + 1 if end_id is not None else None
+    cost, legs, nodes_visited = leg_costs(cg, points, matrix, stats)
+
+    if m == 0:
+        route = [0] if end is None else [0, end]
+    elif m <= HELD_KARP_LIMIT:
+        order, _ = held_karp(cost, m, end)
+        route = [0] + order + ([end] if end is not None else [])
+    else:
+        route = two_opt(cost, nearest_insertion(cost, m, end), end is not None)
+
+    order = [points[i] for i in route[1:len(route) - (end is not None)]]
+    total = _route_cost(cost, route)
+    if total >= CLOSED:
+        return order, None, None, nodes_visited
+    path_ids = [start_id]
+    for a, b in zip(route, route[1:]):
+        path_ids.extend(legs(a, b)[1:])
+    return order, path_ids, total, nodes_visited
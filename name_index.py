@@ -0,0 +1,102 @@
+import bisect
+from collections import Counter
+
+# Name lookups beyond the exact, case-insensitive match in Router.node_name_map: prefix
+# completion from a sorted key list and typo-tolerant matching from a trigram index.
+# Both structures are updated per name, so Router edits never rebuild them.
+
+def normalize_name(name):
+    """Lowercase and collapse whitespace, the form names are indexed and queried in."""
+    return " ".join(str(name).lower().split())
+
+def trigrams(text):
+    """Character trigrams of a normalized name, padded so short names still have some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """Prefix and fuzzy lookup over node names."""
+
+    def __init__(self, names=()):
+        self._keys = []        # Sorted (normalized name, name) pairs for prefix search
+        self._normalized = {}  # name -> normalized name
+        self._names = {}       # entry of _keys -> name (names need not be strings)
+        self._sizes = {}       # name -> number of distinct trigrams
+        self._postings = {}    # trigram -> set of names containing it
+        for name in names:
+            self._index(name)
+        self._keys = sorted(self._names) # One sort instead of an insort per name
+
+    def __len__(self):
+        return len(self._normalized)
+
+    def _index(self, name):
+        # Everything add() does except placing the key; returns the new key entry, or None
+        if name in self._normalized:
+            return None
+        key = normalize_name(name)
+        self._normalized[name] = key
+        entry = (key, str(name))
+        self._names[entry] = name
+        grams = trigrams(key)
+        self._sizes[name] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+        return entry
+
+    def add(self, name):
+        entry = self._index(name)
+        if entry is not None:
+            bisect.insort(self._keys, entry)
+
+    def remove(self, name):
+        key = self._normalized.pop(name, None)
+        if key is None:
+            return
+        entry = (key, str(name))
+        del self._keys[bisect.bisect_left(self._keys, entry)]
+        del self._names[entry]
+        del self._sizes[name]
+        for gram in trigrams(key):
+            names = self._postings[gram]
+            names.discard(name)
+            if not names:
+                del self._postings[gram]
+
+    def complete(self, prefix, limit=10):
+        """Names starting with prefix (case-insensitive), alphabetically, at most limit."""
+        prefix = normalize_name(prefix)
+        i = bisect.bisect_left(self._keys, (prefix, ""))
+        found = []
+        while i < len(self._keys) and len(found) < limit and self._keys[i][0].startswith(prefix):
+            found.append(self._names[self._keys[i]])
+            i += 1
+        return found
+
+    def fuzzy(self, text, limit=5, min_score=0.3):
+        """
+        Names most similar to text, as [(score, name), ...] best first. The score is the
+        Dice coefficient of the trigram sets (1.0 for an exact match); only names sharing
+        a trigram with text are ever looked at.
+        """
+        query = trigrams(normalize_name(text))
+        shared = Counter()
+        for gram in query:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for name, common in shared.items():
+            score = 2 * common / (len(query) + self._sizes[name])
+            if score >= min_score:
+                scored.append((score, name))
+        scored.sort(key=lambda item: (-item[0], self._normalized[item[1]]))
+        return scored[:limit]
+
+    def suggest(self, text, limit=5):
+        """Completions of text first, then fuzzy matches, without duplicates."""
+        found = self.complete(text, limit) if text.strip() else []
+        for _, name in self.fuzzy(text, limit):
+            if len(found) >= limit:
+                break
+            if name not in found:
+                found.append(name)
+        return found
@@ -0,0 +1,236 @@
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from compiled_graph import CompiledGraph, typecode
+from contraction import ContractionHierarchy, build_hierarchy
+from router import ALGORITHMS, format_node_name_for_display
+from search import nearest_targets
+
+# Multi-core batch routing. The compiled graph's CSR arrays are copied once into a
+# shared-memory block; pool workers map them as memoryviews instead of receiving pickled
+# dicts, so starting a worker costs the same for a million-node map as for the campus.
+# Preprocessing (the "ch" hierarchy, the "astar-alt" landmark tables) is built once in
+# this process the first time a query needs it and shared the same way.
+# Queries are read in chunks and grouped by start node and algorithm. A "ucs" group with
+# several goals is answered by one Dijkstra that stops when its last goal is settled;
+# every other group runs the requested algorithm once per goal. Results are yielded in
+# input order.
+
+class SharedArrays:
+    """
+    Arrays packed into one shared-memory block. Use as a context manager in the parent
+    process; `layout` is what another process needs to map them (see attach_arrays()).
+    """
+
+    def __init__(self, arrays):
+        size = sum(values.itemsize * len(values) for values in arrays)
+        self._shm = SharedMemory(create=True, size=max(size, 1))
+        position = 0
+        for values in arrays:
+            raw = memoryview(values).cast("B")
+            self._shm.buf[position:position + len(raw)] = raw
+            position += len(raw)
+        self.layout = (self._shm.name, [(typecode(values), len(values)) for values in arrays])
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach_arrays(layout):
+    """Map SharedArrays as memoryviews without copying. Returns (views, shm); keep shm alive while they are used."""
+    name, specs = layout
+    shm = SharedMemory(name=name)
+    views = []
+    position = 0
+    for code, count in specs:
+        # Every array holds 8-byte items (int64 or float64)
+        views.append(shm.buf[position:position + 8 * count].cast(code))
+        position += 8 * count
+    return views, shm
+
+class SharedGraph(SharedArrays):
+    """A CompiledGraph's coordinate and CSR arrays as SharedArrays (see attach_graph())."""
+
+    def __init__(self, cg):
+        SharedArrays.__init__(self, [cg.lat, cg.lon, cg.offsets, cg.targets, cg.weights])
+
+def attach_graph(layout):
+    """
+    Map a SharedGraph as a CompiledGraph without copying. Node ids are kept as they are
+    (names are range(n)); the parent process turns ids back into names.
+    Returns (cg, shm); keep shm alive as long as cg is used.
+    """
+    (lat, lon, offsets, targets, weights), shm = attach_arrays(layout)
+    return CompiledGraph(range(len(lat)), offsets, targets, weights, lat, lon, ids={}), shm
+
+def _preprocessing(cg, algorithm):
+    """
+    (arrays, details) of the preprocessing `algorithm` reads from cg.cache, built here if
+    needed; None for algorithms without any. details are the small non-array parts.
+    """
+    if algorithm == "ch":
+        hierarchy = cg.cache.get("ch")
+        if hierarchy is None:
+            hierarchy = cg.cache["ch"] = build_hierarchy(cg)
+        arrays = [hierarchy.rank, hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_weights, hierarchy.up_middle,
+                  hierarchy.down_offsets, hierarchy.down_targets, hierarchy.down_weights, hierarchy.down_middle]
+        return arrays, hierarchy.fingerprint
+    if algorithm == "astar-alt":
+        heuristic = ALGORITHMS[algorithm].keywords["heuristic"]
+        landmarks, from_tables, to_tables = heuristic.tables(cg)
+        return from_tables + to_tables, (heuristic.count, landmarks)
+    return None
+
+def _install(cg, algorithm, views, details):
+    """Put shared preprocessing into cg.cache where the algorithm's kernel looks for it."""
+    if algorithm == "ch":
+        cg.cache["ch"] = ContractionHierarchy(details, views[0], views[1:5], views[5:9])
+    else:
+        count, landmarks = details
+        cg.cache[("alt", count)] = (landmarks, views[:len(landmarks)], views[len(landmarks):])
+
+# Graph of this worker process, set by _init_worker, and the shared-memory blocks it maps
+_worker_graph = None
+_worker_shm = []
+_worker_prepared = set()
+
+def _init_worker(layout):
+    global _worker_graph
+    _worker_graph, shm = attach_graph(layout)
+    _worker_shm.append(shm)
+
+def _answer(task):
+    """
+    Answer every query of one (start node, algorithm) group. Returns [(index, goal_id,
+    path_ids, cost, nodes_visited, elapsed_time), ...]; path_ids is None when the goal
+    cannot be reached.
+    """
+    start_id, algorithm, goals, prepared = task
+    cg = _worker_graph
+    if prepared is not None and algorithm not in _worker_prepared:
+        layout, details = prepared
+        views, shm = attach_arrays(layout)
+        _worker_shm.append(shm)
+        _install(cg, algorithm, views, details)
+        _worker_prepared.add(algorithm)
+
+    if algorithm == "ucs" and len(goals) > 1:
+        started = time.perf_counter()
+        target_ids = {goal_id for _, goal_id in goals}
+        found, nodes_visited = nearest_targets(cg, start_id, target_ids, len(target_ids))
+        routes = {target: (path_ids, total_cost) for target, total_cost, path_ids in found}
+        elapsed_time = time.perf_counter() - started
+        return [(index, goal_id) + routes.get(goal_id, (None, None)) + (nodes_visited, elapsed_time) for index, goal_id in goals]
+
+    kernel = ALGORITHMS[algorithm]
+    answers = []
+    for index, goal_id in goals:
+        started = time.perf_counter()
+        path_ids, total_cost, nodes_visited = kernel(cg, start_id, goal_id)
+        answers.append((index, goal_id, path_ids, total_cost, nodes_visited, time.perf_counter() - started))
+    return answers
+
+def _chunks(queries, size):
+    chunk = []
+    for query in queries:
+        chunk.append(query)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _prepare(router, cg, chunk, algorithm, shared):
+    """
+    Resolve and validate one chunk; returns (results, tasks) with errors already filled in.
+    `shared` maps algorithm -> (SharedArrays, details) of the preprocessing shared so far.
+    """
+    results = []
+    groups = {}
+    for index, query in enumerate(chunk):
+        user_start = query.get("start")
+        user_goal = query.get("goal")
+        query_algorithm = query.get("algorithm") or algorithm
+        start = router.locate(user_start)
+        goal = router.resolve(user_goal)
+        result = {
+            "start": user_start,
+            "goal": user_goal,
+            "algorithm": query_algorithm,
+            "path": None,
+            "cost": None,
+            "nodes_visited": None,
+            "elapsed_time": None,
+            "error": None,
+        }
+        results.append(result)
+        if query_algorithm not in ALGORITHMS:
+            result["error"] = f"Unknown algorithm '{query_algorithm}'."
+            continue
+        is_valid, error_message = router.validate_nodes(start, goal, user_start, user_goal)
+        if not is_valid:
+            result["error"] = error_message
+            continue
+        groups.setdefault((cg.ids[start], query_algorithm), []).append((index, cg.ids[goal]))
+    tasks = []
+    for (start_id, query_algorithm), goals in groups.items():
+        if query_algorithm not in shared:
+            preprocessing = _preprocessing(cg, query_algorithm)
+            if preprocessing is not None:
+                arrays, details = preprocessing
+                preprocessing = (SharedArrays(arrays), details)
+            shared[query_algorithm] = preprocessing
+        prepared = shared[query_algorithm]
+        tasks.append((start_id, query_algorithm, goals, (prepared[0].layout, prepared[1]) if prepared is not None else None))
+    return results, tasks
+
+def _collect(cg, results, tasks, answers):
+    for task, task_answers in zip(tasks, answers.get()):
+        start = cg.names[task[0]]
+        for index, goal_id, path_ids, total_cost, nodes_visited, elapsed_time in task_answers:
+            result = results[index]
+            result["nodes_visited"] = nodes_visited
+            result["elapsed_time"] = elapsed_time
+            if path_ids is None:
+                goal = cg.names[goal_id]
+                result["error"] = f"No path exists from '{format_node_name_for_display(start)}' to '{format_node_name_for_display(goal)}'."
+            else:
+                result["path"] = cg.path_names(path_ids)
+                result["cost"] = total_cost
+    return results
+
+def run_parallel_batch(router, queries, algorithm="ucs", workers=None, chunk_size=10000):
+    """
+    Like batch.run_batch(), but spread over `workers` processes (default: all cores).
+    Yields result dicts in input order. "ucs" queries sharing a start share one search,
+    so their nodes_visited and elapsed_time are those of that search; routes may differ
+    from run_batch() only between paths of equal cost.
+    """
+    cg = router.compiled
+    workers = workers or os.cpu_count() or 1
+    shared = {} # algorithm -> (SharedArrays, details) of its preprocessing, or None
+    with SharedGraph(cg) as graph, Pool(workers, initializer=_init_worker, initargs=(graph.layout,)) as pool:
+        try:
+            pending = deque()
+            for chunk in _chunks(queries, chunk_size):
+                results, tasks = _prepare(router, cg, chunk, algorithm, shared)
+                chunksize = max(1, len(tasks) // (workers * 4))
+                # Submit before collecting the previous chunk, so workers stay busy while
+                # this process resolves names and writes results
+                pending.append((results, tasks, pool.map_async(_answer, tasks, chunksize)))
+                if len(pending) > 1:
+                    yield from _collect(cg, *pending.popleft())
+            while pending:
+                yield from _collect(cg, *pending.popleft())
+        finally:
+            for preprocessing in shared.values():
+                if preprocessing is not None:
+                    preprocessing[0].close()
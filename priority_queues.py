@@ -0,0 +1,248 @@
+import heapq
+
+# Priority queues for the searches, all keyed by integer node ids 0..size-1 with the same
+# interface, so search.queue_search() can run on any of them:
+#
+#   queue = Queue(size, max_weight)
+#   queue.push(node, key)   insert node, or lower its key if it is already queued
+#   queue.pop()             (key, node) with the smallest key; superseded entries are skipped
+#   len(queue)              nodes currently queued (bool(queue) is False when none are)
+#   queue.pops, .entries    entries removed so far (stale ones included) and still stored
+#
+# Lazy queues keep a superseded entry until it surfaces and then drop it inside pop(), so
+# callers never see stale entries. BucketQueue and RadixHeap need integer keys that never
+# go below the last key popped, which holds for Dijkstra on integer edge costs.
+# `max_weight_limit` is the largest edge cost a queue is built for (None for any).
+
+class HeapQueue:
+    """Binary heap (heapq) with lazy deletion: a key decrease pushes a new entry."""
+    integer_keys = False
+    max_weight_limit = None
+
+    def __init__(self, size, max_weight=None):
+        self._heap = []
+        self._keys = [None] * size # Key of each queued node, None when not queued
+        self._queued = 0
+        self.pops = 0
+
+    def __len__(self):
+        return self._queued
+
+    @property
+    def entries(self):
+        return len(self._heap)
+
+    def push(self, node, key):
+        current = self._keys[node]
+        if current is None:
+            self._queued += 1
+        elif key >= current:
+            return
+        self._keys[node] = key
+        heapq.heappush(self._heap, (key, node))
+
+    def pop(self):
+        heap, keys = self._heap, self._keys
+        while True:
+            key, node = heapq.heappop(heap)
+            self.pops += 1
+            if keys[node] == key:
+                keys[node] = None
+                self._queued -= 1
+                return key, node
+
+class IndexedHeap:
+    """
+    Binary heap with a position index, so a key decrease moves the node's one entry up
+    instead of adding another. Never holds stale entries.
+    """
+    integer_keys = False
+    max_weight_limit = None
+
+    def __init__(self, size, max_weight=None):
+        self._nodes = []          # Heap of node ids
+        self._keys = [0] * size
+        self._position = [-1] * size # Index of each node in _nodes, -1 when not queued
+        self.pops = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def entries(self):
+        return len(self._nodes)
+
+    def push(self, node, key):
+        position = self._position[node]
+        if position == -1:
+            position = len(self._nodes)
+            self._nodes.append(node)
+        elif key >= self._keys[node]:
+            return
+        self._keys[node] = key
+        self._sift_up(position, node, key)
+
+    def _sift_up(self, position, node, key):
+        nodes, keys, positions = self._nodes, self._keys, self._position
+        while position > 0:
+            parent = (position - 1) >> 1
+            parent_node = nodes[parent]
+            if keys[parent_node] <= key:
+                break
+            nodes[position] = parent_node
+            positions[parent_node] = position
+            position = parent
+        nodes[position] = node
+        positions[node] = position
+
+    def pop(self):
+        nodes, keys, positions = self._nodes, self._keys, self._position
+        top = nodes[0]
+        last = nodes.pop()
+        positions[top] = -1
+        self.pops += 1
+        if nodes:
+            # Sift the last node down from the root
+            key = keys[last]
+            size = len(nodes)
+            position = 0
+            child = 1
+            while child < size:
+                right = child + 1
+                if right < size and keys[nodes[right]] < keys[nodes[child]]:
+                    child = right
+                child_node = nodes[child]
+                if keys[child_node] >= key:
+                    break
+                nodes[position] = child_node
+                positions[child_node] = position
+                position = child
+                child = 2 * position + 1
+            nodes[position] = last
+            positions[last] = position
+        return keys[top], top
+
+class BucketQueue:
+    """
+    Dial's bucket queue: one bucket per integer key in a ring of max_weight + 1 buckets.
+    Every queued key lies within max_weight of the last key popped, so the ring never
+    wraps onto itself; push is O(1) and pop scans forward over at most max_weight buckets.
+    """
+    integer_keys = True
+    # Every query allocates the whole ring, so maps with longer edges use another queue
+    max_weight_limit = 1 << 16
+
+    def __init__(self, size, max_weight=1):
+        self._ring = max_weight + 1
+        self._buckets = [[] for _ in range(self._ring)]
+        self._keys = [None] * size
+        self._queued = 0
+        self._entries = 0
+        self._cursor = 0 # Smallest key that can still be queued
+        self.pops = 0
+
+    def __len__(self):
+        return self._queued
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def push(self, node, key):
+        current = self._keys[node]
+        if current is None:
+            self._queued += 1
+        elif key >= current:
+            return
+        self._keys[node] = key
+        self._buckets[key % self._ring].append(node)
+        self._entries += 1
+
+    def pop(self):
+        buckets, keys, ring = self._buckets, self._keys, self._ring
+        cursor = self._cursor
+        while True:
+            bucket = buckets[cursor % ring]
+            while bucket:
+                node = bucket.pop()
+                self._entries -= 1
+                self.pops += 1
+                if keys[node] == cursor:
+                    keys[node] = None
+                    self._queued -= 1
+                    self._cursor = cursor
+                    return cursor, node
+            cursor += 1
+
+class RadixHeap:
+    """
+    Radix heap: entries sit in bucket i when their key first differs from the last popped
+    key at bit i - 1. A pop that finds bucket 0 empty takes the lowest non-empty bucket,
+    makes its smallest key the new last key and redistributes the rest into lower buckets,
+    so each entry moves O(log C) times in total.
+    """
+    integer_keys = True
+    max_weight_limit = None
+
+    def __init__(self, size, max_weight=None):
+        self._buckets = [[] for _ in range(65)] # Keys up to 2**64
+        self._keys = [None] * size
+        self._queued = 0
+        self._entries = 0
+        self._last = 0
+        self.pops = 0
+
+    def __len__(self):
+        return self._queued
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def push(self, node, key):
+        current = self._keys[node]
+        if current is None:
+            self._queued += 1
+        elif key >= current:
+            return
+        self._keys[node] = key
+        self._buckets[(key ^ self._last).bit_length()].append((key, node))
+        self._entries += 1
+
+    def pop(self):
+        buckets, keys = self._buckets, self._keys
+        while True:
+            if not buckets[0]:
+                i = 1
+                while not buckets[i]:
+                    i += 1
+                bucket = buckets[i]
+                buckets[i] = []
+                # Drop stale entries now rather than moving them down
+                live = []
+                for key, node in bucket:
+                    if keys[node] == key:
+                        live.append((key, node))
+                    else:
+                        self._entries -= 1
+                        self.pops += 1
+                if not live:
+                    continue
+                last = self._last = min(live)[0]
+                for entry in live:
+                    buckets[(entry[0] ^ last).bit_length()].append(entry)
+            key, node = buckets[0].pop()
+            self._entries -= 1
+            self.pops += 1
+            if keys[node] == key:
+                keys[node] = None
+                self._queued -= 1
+                return key, node
+
+# Queue classes by name
+QUEUES = {
+    "heap": HeapQueue,
+    "indexed": IndexedHeap,
+    "dial": BucketQueue,
+    "radix": RadixHeap,
+}
@@ -0,0 +1,193 @@
+import heapq
+import math
+from compiled_graph import CLOSED
+from search import DEFAULT_HEURISTIC
+
+# Incremental replanning with D* Lite (Koenig & Likhachev), the moving-start form of
+# Lifelong Planning A*. The search runs backward from the goal and keeps its g/rhs values
+# between queries; after edge costs change, only the nodes whose distance to the goal is
+# affected are expanded again, instead of searching from scratch. The planner works on a
+# CompiledGraph whose weights are changed in place (CompiledGraph.set_weight), so it reads
+# the new costs directly and only needs to be told which edges changed.
+
+class DStarLite:
+    """
+    Shortest path from start to goal that can be repaired after edge cost changes
+    (edges_changed) or as the start moves along the route (move_start).
+    `heuristic` follows the heuristics.py interface; it must be consistent.
+    """
+
+    def __init__(self, cg, start_id, goal_id, heuristic=None):
+        self.cg = cg
+        self.start = start_id
+        self.goal = goal_id
+        self.heuristic = heuristic if heuristic is not None else DEFAULT_HEURISTIC
+        n = len(cg)
+        self.g = [math.inf] * n
+        self.rhs = [math.inf] * n
+        self.rhs[goal_id] = 0
+        self.km = 0 # Key offset accumulated by start moves
+        self._queue = []
+        self._keys = [None] * n # Current key of each queued node, None when not queued
+        self._factor = 1.0
+        self._h = self._start_heuristic()
+        self._push(goal_id)
+        self.nodes_visited = 0 # Expansions by the last plan()
+
+    def _start_heuristic(self):
+        # Estimates of the distance from start to each node: a goal heuristic on the
+        # reversed graph, scaled down by _factor to stay consistent after cost decreases
+        h = self._base_h = self.heuristic.for_goal(self.cg.reversed(), self.start)
+        return self._scaled()
+
+    def _scaled(self):
+        h, factor = self._base_h, self._factor
+        if factor == 1.0:
+            return h
+        return lambda node: factor * h(node)
+
+    def _key(self, node):
+        best = min(self.g[node], self.rhs[node])
+        return (best + self._h(node) + self.km, best)
+
+    def _push(self, node):
+        key = self._key(node)
+        self._keys[node] = key
+        heapq.heappush(self._queue, (key, node))
+
+    def _top_key(self):
+        queue, keys = self._queue, self._keys
+        while queue and keys[queue[0][1]] != queue[0][0]:
+            heapq.heappop(queue) # Stale entry
+        return queue[0][0] if queue else (math.inf, math.inf)
+
+    def _best_successor_cost(self, node):
+        cg, g = self.cg, self.g
+        offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+        best = math.inf
+        for i in range(offsets[node], offsets[node + 1]):
+            cost = weights[i] + g[targets[i]]
+            if cost < best:
+                best = cost
+        return best
+
+    def _update(self, node):
+        if self.g[node] != self.rhs[node]:
+            self._push(node)
+        else:
+            self._keys[node] = None
+
+    def _compute(self):
+        g, rhs, keys = self.g, self.rhs, self._keys
+        reverse = self.cg.reversed()
+        offsets, sources, weights = reverse.offsets, reverse.targets, reverse.weights
+        start = self.start
+        expanded = 0
+        while self._top_key() < self._key(start) or rhs[start] != g[start]:
+            old_key, node = heapq.heappop(self._queue)
+            new_key = self._key(node)
+            if old_key < new_key:
+                self._push(node)
+                continue
+            keys[node] = None
+            expanded += 1
+            if g[node] > rhs[node]:
+                # Overconsistent: its distance dropped, which can only lower its predecessors'
+                g[node] = rhs[node]
+                for i in range(offsets[node], offsets[node + 1]):
+                    source = sources[i]
+                    cost = weights[i] + g[node]
+                    if cost < rhs[source]:
+                        rhs[source] = cost
+                        self._update(source)
+            else:
+                # Underconsistent: its distance grew; predecessors that relied on it re-derive theirs
+                old_g = g[node]
+                g[node] = math.inf
+                self._update(node) # Its rhs comes from its successors, so it still holds
+                for i in range(offsets[node], offsets[node + 1]):
+                    source = sources[i]
+                    if source != self.goal and rhs[source] == weights[i] + old_g:
+                        rhs[source] = self._best_successor_cost(source)
+                    self._update(source)
+        return expanded
+
+    def plan(self, stats=None):
+        """
+        Bring the search up to date and return (path_ids, cost, nodes_visited) like the
+        search kernels; path_ids is None when the goal is unreachable. nodes_visited only
+        counts the expansions this call needed.
+        """
+        self.nodes_visited = self._compute()
+        if stats is not None:
+            stats.nodes_visited = self.nodes_visited # Heap counters are not tracked here
+        cost = self.g[self.start]
+        if cost >= CLOSED:
+            return None, None, self.nodes_visited
+        return self.path(), cost, self.nodes_visited
+
+    def path(self):
+        """Follow the cheapest successor from start to goal using the current g values."""
+        cg, g = self.cg, self.g
+        offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+        path = [self.start]
+        node = self.start
+        while node != self.goal:
+            best, best_cost = -1, math.inf
+            for i in range(offsets[node], offsets[node + 1]):
+                cost = weights[i] + g[targets[i]]
+                if cost < best_cost:
+                    best, best_cost = targets[i], cost
+            if best == -1 or len(path) > len(g):
+                return None
+            path.append(best)
+            node = best
+        return path
+
+    def edges_changed(self, changes):
+        """
+        Repair the search state after edges were reweighted in place. `changes` holds
+        (source_id, target_id, old_weight) tuples; the new weights are read from the graph.
+        The next plan() expands only what the changes affect.
+        """
+        cg, g, rhs = self.cg, self.g, self.rhs
+        rekey = False
+        for source, target, old_weight in changes:
+            new_weight = self._weight(source, target)
+            if new_weight is None:
+                continue
+            rise = self._h(target) - self._h(source)
+            if rise > new_weight:
+                # The heuristic is no longer consistent on this edge. Scaling it down
+                # restores that here and keeps it on every other edge, without
+                # recalibrating over the whole graph
+                self._factor *= new_weight / rise
+                self._h = self._scaled()
+                rekey = True
+            if source == self.goal:
+                continue
+            if new_weight < old_weight:
+                rhs[source] = min(rhs[source], new_weight + g[target])
+            elif rhs[source] == old_weight + g[target]:
+                rhs[source] = self._best_successor_cost(source)
+            self._update(source)
+        if rekey:
+            queued = [node for node, key in enumerate(self._keys) if key is not None]
+            self._queue = []
+            for node in queued:
+                self._push(node)
+
+    def move_start(self, start_id):
+        """Continue from a new start, e.g. after the user has walked part of the route."""
+        if start_id == self.start:
+            return
+        self.km += self._h(start_id)
+        self.start = start_id
+        self._h = self._start_heuristic()
+
+    def _weight(self, source, target):
+        cg = self.cg
+        for i in range(cg.offsets[source], cg.offsets[source + 1]):
+            if cg.targets[i] == target:
+                return cg.weights[i]
+        return None
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from itertools import islice
+from search import settle_within
+
+class RouteCache:
+    """
+    LRU cache of search results keyed on (algorithm, start, goal), plus a small LRU of
+    shortest-path trees that answer a query from a cached start to any goal they reach.
+    A tree is a Dijkstra from the start stopped after tree_nodes settled nodes, so
+    building one costs a query a bounded amount of extra work however large the map is.
+
+    Only successful routes are cached. Router calls invalidate() after every edit:
+    removing nodes only drops the routes whose path went through one of them (nothing
+    else can get shorter), while adding or changing edges clears every route because a
+    new edge can shorten any of them. Trees are indexed by node id of one compiled graph,
+    so any edit clears them.
+    """
+
+    def __init__(self, max_routes=1024, max_trees=8, tree_after=2, tree_nodes=4096):
+        self.max_routes = max_routes
+        self.max_trees = max_trees
+        self.tree_after = tree_after # Build a tree once a start has been searched this many times
+        self.tree_nodes = tree_nodes # Nodes settled per tree
+        self.routes = OrderedDict()  # key -> (path, total_cost)
+        self.routes_by_node = {}     # node -> keys of the cached routes through it
+        self.trees = OrderedDict()   # start -> {node id: (cost, parent id)} for the settled nodes
+        self.start_counts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.routes)
+
+    def get(self, algorithm, start, goal, cg):
+        """Return (path, total_cost) for a cached route or tree, or None on a miss."""
+        key = (algorithm, start, goal)
+        route = self.routes.get(key)
+        if route is not None:
+            self.routes.move_to_end(key)
+            self.hits += 1
+            return route
+        tree = self.trees.get(start)
+        if tree is not None:
+            self.trees.move_to_end(start)
+            goal_id = cg.ids[goal]
+            if goal_id in tree:
+                self.hits += 1
+                path_ids = []
+                node = goal_id
+                while node != -1:
+                    path_ids.append(node)
+                    node = tree[node][1]
+                path_ids.reverse()
+                route = (cg.path_names(path_ids), tree[goal_id][0])
+                self.put(algorithm, start, goal, *route)
+                return route
+        self.misses += 1
+        return None
+
+    def wants_tree(self, start):
+        """Count a miss from `start`; True when it is worth caching its whole tree."""
+        if self.max_trees <= 0:
+            return False
+        count = self.start_counts.get(start, 0) + 1
+        self.start_counts[start] = count
+        return count >= self.tree_after
+
+    def add_tree(self, start, cg):
+        """Run a Dijkstra from `start` for up to tree_nodes settled nodes and keep its tree."""
+        settled = settle_within(cg, cg.ids[start])
+        self.trees[start] = {node: (cost, parent) for node, cost, parent in islice(settled, self.tree_nodes)}
+        settled.close()
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last=False)
+
+    def put(self, algorithm, start, goal, path, total_cost):
+        key = (algorithm, start, goal)
+        if key in self.routes:
+            self._forget(key)
+        self.routes[key] = (path, total_cost)
+        for node in path:
+            self.routes_by_node.setdefault(node, set()).add(key)
+        while len(self.routes) > self.max_routes:
+            self._forget(next(iter(self.routes)))
+
+    def _forget(self, key):
+        path, _ = self.routes.pop(key)
+        for node in path:
+            keys = self.routes_by_node.get(node)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.routes_by_node[node]
+
+    def invalidate(self, removed_nodes=None):
+        """
+        Drop what an edit may have made stale. With removed_nodes, only routes through
+        those nodes go; with None (edges added or changed) every route goes.
+        """
+        self.trees.clear()
+        self.start_counts.clear()
+        if removed_nodes is None:
+            self.routes.clear()
+            self.routes_by_node.clear()
+            return
+        for node in removed_nodes:
+            for key in list(self.routes_by_node.get(node, ())):
+                self._forget(key)
+
+    def stats(self):
+        return {
+            "routes": len(self.routes),
+            "trees": len(self.trees),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,583 @@
+import copy
+import math
+from functools import partial
+import campus_map
+from alternatives import k_shortest_paths
+import search
+from compiled_graph import compile_graph, typecode
+from components import detached_nodes
+from contraction import build_hierarchy, ch_search, load_hierarchy
+from distance_matrix import build_distance_matrix, open_distance_matrix
+from graph_io import is_snapshot, load_map, load_snapshot, save_snapshot, snapshot_coordinates, snapshot_graph, snapshot_non_eatery_nodes
+from heuristics import LandmarkHeuristic, TableHeuristic
+from instrumentation import SearchStats
+from multi_stop import plan_stops
+from name_index import NameIndex
+from priority_queues import BucketQueue, IndexedHeap, RadixHeap
+from replanning import DStarLite
+from route_cache import RouteCache
+from spatial_index import GridIndex
+from tiled_graph import build_tiles
+
+def format_node_name_for_display(node_name):
+    """
+    Convert node name to title case for display purposes.
+    Special handling for CBTL to keep it as CBTL.
+    """
+    if node_name is None:
+        return "Unknown Node"
+    if node_name.lower() == "cbtl":
+        return "CBTL"
+    if node_name.lower() == "perico's":
+        return "Perico's"
+    return node_name.title()
+
+# Search kernels available to Router.search, keyed by algorithm name
+ALGORITHMS = {
+    "ucs": search.uniform_cost_search,
+    "astar": search.a_star, # Calibrated haversine heuristic
+    "astar-table": partial(search.a_star, heuristic=TableHeuristic()), # Same, precomputed per goal
+    "astar-alt": partial(search.a_star, heuristic=LandmarkHeuristic()), # Landmark (ALT) heuristic
+    "bidirectional-ucs": search.bidirectional_dijkstra,
+    "bidirectional-astar": search.bidirectional_a_star,
+    "ch": ch_search, # Contraction Hierarchies; preprocesses on first use after each edit
+    # The same searches on the other priority queues in priority_queues.py
+    "ucs-indexed": partial(search.queue_search, queue=IndexedHeap),
+    "ucs-dial": partial(search.queue_search, queue=BucketQueue),
+    "ucs-radix": partial(search.queue_search, queue=RadixHeap),
+    "astar-indexed": partial(search.queue_search, queue=IndexedHeap, heuristic=search.DEFAULT_HEURISTIC),
+}
+
+class Router:
+    """
+    Headless routing engine that owns the graph, coordinates and non-eatery nodes.
+    Nothing here prompts, clears the screen or renders; the interactive menu in
+    main.py and the batch runner in batch.py are both thin layers on top of it.
+    """
+
+    def __init__(self, graph=None, coordinates=None, non_eatery_nodes=None, cache_size=1024, anchor=None, compiled=None):
+        if compiled is not None:
+            # A loaded snapshot: queries run on the compiled graph, and the dict views
+            # below are only built from it when an edit or the renderer asks for them
+            self._graph = self._coordinates = self._non_eatery_nodes = self._node_name_map = None
+        else:
+            # Default to a private copy of the built-in campus map
+            self._graph = graph if graph is not None else copy.deepcopy(campus_map.graph)
+            self._coordinates = coordinates if coordinates is not None else dict(campus_map.coordinates)
+            self._non_eatery_nodes = non_eatery_nodes if non_eatery_nodes is not None else set(campus_map.non_eatery_nodes)
+            self._node_name_map = {name.lower(): name for name in self._graph.keys()}
+        self._snapshot = compiled # Source of the views not built yet
+        self._compiled = compiled
+        self.version = 0 # Bumped on every edit
+        # Node whose component survives removals; None keeps the largest component
+        self.anchor = anchor
+        # Repeated routes are answered from here; cache_size=0 disables it
+        self.route_cache = RouteCache(cache_size) if cache_size else None
+        # Built on first use, then kept up to date by add_node/remove_nodes
+        self._spatial_index = None
+        self._name_index = None
+        # Standing routes kept up to date incrementally: (start, goal) -> DStarLite or None
+        self.tracked = {}
+
+    @classmethod
+    def load(cls, path, edges_path=None, **kwargs):
+        """
+        Build a Router from a map file (see graph_io.load_map). A snapshot is loaded as
+        its compiled graph only, so the Router is ready as soon as the arrays are read.
+        """
+        if not is_snapshot(path):
+            return cls(*load_map(path, edges_path), **kwargs)
+        return cls(compiled=load_snapshot(path), **kwargs)
+
+    def save_snapshot(self, path):
+        """Save the current map, including edits, as a binary snapshot for Router.load()."""
+        # A loaded snapshot carries its eatery flags, so the name set is not built for it
+        cg = self.compiled
+        save_snapshot(path, cg, self.non_eatery_nodes if cg.eatery is None else ())
+
+    # Dict views of the map. For a loaded snapshot each one is built on first access.
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = snapshot_graph(self._snapshot)
+        return self._graph
+
+    @property
+    def coordinates(self):
+        if self._coordinates is None:
+            self._coordinates = snapshot_coordinates(self._snapshot)
+        return self._coordinates
+
+    @property
+    def non_eatery_nodes(self):
+        if self._non_eatery_nodes is None:
+            self._non_eatery_nodes = snapshot_non_eatery_nodes(self._snapshot)
+        return self._non_eatery_nodes
+
+    @property
+    def node_name_map(self):
+        if self._node_name_map is None:
+            self._node_name_map = {name.lower(): name for name in self._snapshot.names}
+        return self._node_name_map
+
+    def __len__(self):
+        return len(self._graph) if self._graph is not None else len(self._snapshot)
+
+    def has_node(self, node):
+        """node in self.graph, answered from a loaded snapshot without building the graph dict."""
+        if self._graph is None:
+            return node in self._snapshot.ids
+        return node in self._graph
+
+    def is_eatery(self, node):
+        """True unless node is one of the non-eatery nodes."""
+        if self._non_eatery_nodes is None:
+            return bool(self._snapshot.eatery[self._snapshot.ids[node]])
+        return node not in self._non_eatery_nodes
+
+    @property
+    def compiled(self):
+        """Compiled (CSR) form of the graph, rebuilt lazily after edits."""
+        if self._compiled is None:
+            self._compiled = compile_graph(self.graph, self.coordinates)
+        return self._compiled
+
+    @property
+    def spatial_index(self):
+        """GridIndex over the node coordinates, for snapping positions to nodes."""
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex({node: position for node, position in self.coordinates.items() if self.has_node(node)})
+        return self._spatial_index
+
+    @property
+    def name_index(self):
+        """NameIndex over the node names, for autocomplete and fuzzy matching."""
+        if self._name_index is None:
+            self._name_index = NameIndex(self._node_names())
+        return self._name_index
+
+    def graph_changed(self, removed_nodes=None, nodes_changed=True):
+        """
+        Must be called after editing graph, coordinates or non_eatery_nodes directly.
+        Pass removed_nodes when the edit only removed nodes, so cached routes that avoid
+        them can be kept; otherwise every cached route is dropped. Pass
+        nodes_changed=False when only edges changed, so the node indexes are kept.
+        """
+        if self._snapshot is not None:
+            # The snapshot is about to be dropped; build the views still missing from it
+            for view in ("graph", "coordinates", "non_eatery_nodes", "node_name_map"):
+                getattr(self, view)
+            self._snapshot = None
+        self._compiled = None
+        self.version += 1
+        if self.route_cache is not None:
+            self.route_cache.invalidate(removed_nodes)
+        # Planners are tied to the compiled graph; they restart on the next update
+        for key in self.tracked:
+            self.tracked[key] = None
+        if nodes_changed:
+            self._spatial_index = None
+            self._name_index = None
+
+    def build_hierarchy(self, path=None, progress=None):
+        """
+        Build the Contraction Hierarchy used by the "ch" algorithm now rather than on the
+        first CH query, optionally saving it to `path`. Edits drop the hierarchy together
+        with the compiled graph, so call this again after add_node/remove_node.
+        """
+        hierarchy = build_hierarchy(self.compiled, progress)
+        self.compiled.cache["ch"] = hierarchy
+        if path is not None:
+            hierarchy.save(path)
+        return hierarchy
+
+    def load_hierarchy(self, path):
+        """Use a hierarchy saved earlier; raises ValueError if the graph has changed since."""
+        hierarchy = load_hierarchy(path, self.compiled)
+        self.compiled.cache["ch"] = hierarchy
+        return hierarchy
+
+    def build_distance_matrix(self, path, progress=None):
+        """Precompute all-pairs distances and next hops into `path` (see distance_matrix.py)."""
+        build_distance_matrix(self.compiled, path, progress)
+        return open_distance_matrix(path, self.compiled)
+
+    def open_distance_matrix(self, path):
+        """
+        Memory-map a matrix built earlier; raises ValueError if the graph was edited since.
+        """
+        return open_distance_matrix(path, self.compiled)
+
+    def build_tiles(self, directory, tile_meters=1000, progress=None):
+        """
+        Write the map as spatial tiles for tiled_graph.TiledGraph, which searches maps too
+        large for memory by mapping only the tiles a query reaches.
+        """
+        # A loaded snapshot carries its eatery flags, so the name set is not built for it
+        non_eatery_nodes = self.non_eatery_nodes if self.compiled.eatery is None else ()
+        return build_tiles(self.compiled, directory, non_eatery_nodes, tile_meters, progress)
+
+    def resolve(self, name):
+        """Map a user-entered name to its node name (case-insensitive), or None."""
+        if name is None:
+            return None
+        return self.node_name_map.get(name.strip().lower())
+
+    def locate(self, text, max_distance=None):
+        """
+        Like resolve(), but also accepts a "lat, lon" position, which is snapped to the
+        nearest node (no farther than max_distance metres, if given). Returns the node
+        name or None.
+        """
+        node = self.resolve(text)
+        if node is not None or text is None:
+            return node
+        parts = text.split(",")
+        if len(parts) != 2:
+            return None
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except ValueError:
+            return None
+        nearest = self.nearest_node(lat, lon)
+        if nearest is None or (max_distance is not None and nearest[1] > max_distance):
+            return None
+        return nearest[0]
+
+    def nearest_node(self, lat, lon, eateries_only=False):
+        """The node closest to (lat, lon) as (node, distance in metres), or None if there are none."""
+        where = self.is_eatery if eateries_only else None
+        found = self.spatial_index.nearest(lat, lon, 1, where)
+        if not found:
+            return None
+        distance, node = found[0]
+        return node, distance
+
+    def nodes_within(self, lat, lon, radius):
+        """Nodes within radius metres of (lat, lon) as [(node, distance), ...] nearest first."""
+        return [(node, distance) for distance, node in self.spatial_index.within(lat, lon, radius)]
+
+    def suggest(self, text, limit=5):
+        """Node names that complete or closely match text, for autocomplete and typos."""
+        return self.name_index.suggest(text, limit)
+
+    # Error detection function
+    def validate_nodes(self, start, goal, user_start=None, user_goal=None):
+        """
+        Check if start and goal nodes exist in the graph and if goal is a valid eatery.
+        Returns (is_valid, error_message)
+        """
+        if not self.has_node(start):
+            display_name = format_node_name_for_display(user_start) if user_start else format_node_name_for_display(start)
+            return False, f"Start node '{display_name}' does not exist in the graph."
+        if not self.has_node(goal):
+            display_name = format_node_name_for_display(user_goal) if user_goal else format_node_name_for_display(goal)
+            return False, f"Goal node '{display_name}' does not exist in the graph."
+        # Non-eatery nodes that cannot be used as end goals
+        if not self.is_eatery(goal):
+            return False, f"Error: '{format_node_name_for_display(goal)}' is not an eatery and cannot be used as the end goal. Please choose a valid eatery as the goal."
+        return True, ""
+
+    def search(self, algorithm, start, goal, user_start=None, user_goal=None, stats=None, use_cache=True):
+        """
+        Run the named algorithm (see ALGORITHMS) between two node names.
+        Returns (path, total_cost, error, nodes_visited, elapsed_time, peak_memory).
+        Pass a SearchStats to choose the instrumentation level and receive the full
+        statistics; peak_memory is only measured at the DEEP level and is None otherwise.
+        Routes answered from the route cache report 0 nodes visited.
+        """
+        kernel = ALGORITHMS.get(algorithm)
+        if kernel is None:
+            return None, None, f"Unknown algorithm '{algorithm}'.", None, None, None
+        is_valid, error_message = self.validate_nodes(start, goal, user_start, user_goal)
+        if not is_valid:
+            return None, None, error_message, None, None, None
+
+        if stats is None:
+            stats = SearchStats()
+        stats.algorithm = algorithm
+        cg = self.compiled
+        cache = self.route_cache if use_cache else None
+        stats.start()
+        cached = cache.get(algorithm, start, goal, cg) if cache is not None else None
+        if cached is not None:
+            stats.stop()
+            stats.cache_hit = True
+            stats.record(0, 0, 0, max_frontier=0, initial_pushes=0)
+            path, total_cost = cached
+            return list(path), total_cost, None, 0, stats.elapsed_time, stats.peak_memory
+        path_ids, total_cost, nodes_visited = kernel(cg, cg.ids[start], cg.ids[goal], stats)
+        stats.stop()
+
+        if path_ids is None:
+            return None, None, f"No path exists from '{format_node_name_for_display(start)}' to '{format_node_name_for_display(goal)}'.", nodes_visited, stats.elapsed_time, stats.peak_memory
+        path = cg.path_names(path_ids)
+        if cache is not None:
+            stats.cache_hit = False
+            cache.put(algorithm, start, goal, path, total_cost)
+            if cache.wants_tree(start):
+                cache.add_tree(start, cg) # Bounded; later queries from this start to nearby goals need no search
+        return list(path), total_cost, None, nodes_visited, stats.elapsed_time, stats.peak_memory
+
+    def eateries(self):
+        """All nodes that can be used as a goal."""
+        return [node for node in self._node_names() if self.is_eatery(node)]
+
+    def _node_names(self):
+        return self._graph if self._graph is not None else self._snapshot.names
+
+    def nearest_eateries(self, start, k=1, only=None, where=None, user_start=None, stats=None):
+        """
+        Find the k eateries closest to start with a single search instead of one per eatery.
+        `only` restricts the candidates to a collection of node names and `where` to the
+        names a predicate accepts. Returns (results, error, nodes_visited, elapsed_time,
+        peak_memory) where results is [(eatery, path, total_cost), ...] nearest first;
+        fewer than k results means fewer eateries are reachable.
+        """
+        if not self.has_node(start):
+            display_name = format_node_name_for_display(user_start) if user_start else format_node_name_for_display(start)
+            return None, f"Start node '{display_name}' does not exist in the graph.", None, None, None
+        candidates = [node for node in (only if only is not None else self._node_names())
+                      if self.has_node(node) and self.is_eatery(node) and (where is None or where(node))]
+        if not candidates:
+            return None, "No eateries match the given filters.", None, None, None
+        if k < 1:
+            return None, "The number of eateries to find must be at least 1.", None, None, None
+
+        if stats is None:
+            stats = SearchStats()
+        stats.algorithm = "nearest"
+        cg = self.compiled
+        stats.start()
+        found, nodes_visited = search.nearest_targets(cg, cg.ids[start], {cg.ids[node] for node in candidates}, k, stats)
+        stats.stop()
+        results = [(cg.names[target], cg.path_names(path_ids), cost) for target, cost, path_ids in found]
+        if not results:
+            return None, f"No eatery can be reached from '{format_node_name_for_display(start)}'.", nodes_visited, stats.elapsed_time, stats.peak_memory
+        return results, None, nodes_visited, stats.elapsed_time, stats.peak_memory
+
+    def reachable(self, start, max_cost, eateries_only=False, user_start=None, stats=None):
+        """
+        Everything within max_cost of start, found by one Dijkstra that stops at the limit.
+        Returns (settled, error): settled is a generator of (node, cost, parent) in
+        increasing cost order (parent is None for the start), so callers can stream
+        results or stop early. With eateries_only, only eateries are yielded, but parents
+        can still be other nodes. Stats are filled in once the generator is exhausted or closed.
+        """
+        if not self.has_node(start):
+            display_name = format_node_name_for_display(user_start) if user_start else format_node_name_for_display(start)
+            return None, f"Start node '{display_name}' does not exist in the graph."
+        if not max_cost >= 0:
+            return None, "The cost limit cannot be negative."
+
+        cg = self.compiled
+        names = cg.names
+        where = None
+        if eateries_only:
+            is_eatery = self.is_eatery
+            where = lambda node_id: is_eatery(names[node_id])
+        if stats is not None:
+            stats.algorithm = "reachable"
+
+        def settled():
+            for node_id, cost, parent_id in search.settle_within(cg, cg.ids[start], max_cost, stats, where):
+                yield names[node_id], cost, (names[parent_id] if parent_id != -1 else None)
+        return settled(), None
+
+    def alternative_routes(self, start, goal, k=3, max_overlap=None, user_start=None, user_goal=None, stats=None):
+        """
+        The k cheapest loopless routes from start to goal (see alternatives.py), for
+        fallbacks when the best one is blocked or crowded. With max_overlap, a route is
+        left out when more than that fraction of its cost is shared with a cheaper route
+        already listed. Returns (results, error, nodes_visited, elapsed_time, peak_memory)
+        where results is [(path, total_cost), ...] cheapest first.
+        """
+        is_valid, error_message = self.validate_nodes(start, goal, user_start, user_goal)
+        if not is_valid:
+            return None, error_message, None, None, None
+        if k < 1:
+            return None, "The number of routes to find must be at least 1.", None, None, None
+
+        if stats is None:
+            stats = SearchStats()
+        stats.algorithm = "alternatives"
+        cg = self.compiled
+        stats.start()
+        found, nodes_visited = k_shortest_paths(cg, cg.ids[start], cg.ids[goal], k, max_overlap, stats)
+        stats.stop()
+        if not found:
+            return None, f"No path exists from '{format_node_name_for_display(start)}' to '{format_node_name_for_display(goal)}'.", nodes_visited, stats.elapsed_time, stats.peak_memory
+        results = [(cg.path_names(path_ids), cost) for path_ids, cost in found]
+        return results, None, nodes_visited, stats.elapsed_time, stats.peak_memory
+
+    def plan_stops(self, start, stops, end=None, matrix=None, stats=None):
+        """
+        Cheapest route from start through every node in stops (visited in whatever order
+        is cheapest), finishing at end, or at the last stop when end is None; use
+        end=start for a round trip. See multi_stop.py. With a DistanceMatrix from
+        open_distance_matrix(), leg costs are looked up instead of searched.
+        Returns (result, error, nodes_visited, elapsed_time, peak_memory) where result is
+        (order, path, total_cost) and order lists the stops in visiting order.
+        """
+        for node in [start] + list(stops) + ([end] if end is not None else []):
+            if not self.has_node(node):
+                return None, f"Node '{format_node_name_for_display(node)}' does not exist in the graph.", None, None, None
+
+        if stats is None:
+            stats = SearchStats()
+        stats.algorithm = "multi-stop"
+        cg = self.compiled
+        stats.start()
+        order, path_ids, total_cost, nodes_visited = plan_stops(
+            cg, cg.ids[start], [cg.ids[stop] for stop in stops], cg.ids[end] if end is not None else None, matrix, stats)
+        stats.stop()
+        if path_ids is None:
+            return None, f"Not every stop can be reached from '{format_node_name_for_display(start)}'.", nodes_visited, stats.elapsed_time, stats.peak_memory
+        result = ([cg.names[stop] for stop in order], cg.path_names(path_ids), total_cost)
+        return result, None, nodes_visited, stats.elapsed_time, stats.peak_memory
+
+    def uniform_cost_search(self, start, goal, user_start=None, user_goal=None, stats=None):
+        return self.search("ucs", start, goal, user_start, user_goal, stats)
+
+    def a_star(self, start, goal, user_start=None, user_goal=None, stats=None):
+        return self.search("astar", start, goal, user_start, user_goal, stats)
+
+    def update_edge_costs(self, changes, both_directions=True):
+        """
+        Change the cost of existing edges, given as (node_a, node_b, cost) triples; use
+        math.inf to close an edge. With both_directions the reverse edge changes too.
+        Unlike connect(), the compiled graph is patched in place rather than rebuilt
+        (unless an integer-weighted graph gets a fractional cost), and tracked routes
+        are repaired incrementally. Returns {(start, goal): (path, total_cost)} for the
+        tracked routes whose path or cost changed. Raises ValueError for a missing edge.
+        """
+        edges = []
+        for node_a, node_b, cost in changes:
+            if not cost > 0:
+                raise ValueError("Edge cost must be positive.")
+            pairs = [(node_a, node_b), (node_b, node_a)] if both_directions else [(node_a, node_b)]
+            for source, target in pairs:
+                if target not in self.graph.get(source, {}):
+                    if (source, target) == (node_a, node_b):
+                        raise ValueError(f"There is no edge from '{format_node_name_for_display(source)}' to '{format_node_name_for_display(target)}'.")
+                    continue # One-way edge
+                edges.append((source, target, cost))
+        before = self.tracked_routes()
+        for source, target, cost in edges:
+            self.graph[source][target] = cost
+
+        cg = self._compiled
+        if cg is None or (typecode(cg.weights) == 'q' and not all(isinstance(cost, int) or cost == math.inf for _, _, cost in edges)):
+            self.graph_changed() # Recompile; a fresh planner replaces each tracked one
+        else:
+            changed = []
+            for source, target, cost in edges:
+                source_id, target_id = cg.ids[source], cg.ids[target]
+                changed.append((source_id, target_id, cg.set_weight(source_id, target_id, cost)))
+            self.version += 1
+            if self.route_cache is not None:
+                self.route_cache.invalidate()
+            for planner in self.tracked.values():
+                if planner is not None:
+                    planner.edges_changed(changed)
+        after = self.tracked_routes()
+        return {key: route for key, route in after.items() if before.get(key) != route}
+
+    def track_route(self, start, goal, user_start=None, user_goal=None):
+        """
+        Keep the route from start to goal up to date across update_edge_costs() calls with
+        an incremental D* Lite planner. Returns (path, total_cost, error) like search().
+        """
+        is_valid, error_message = self.validate_nodes(start, goal, user_start, user_goal)
+        if not is_valid:
+            return None, None, error_message
+        self.tracked[(start, goal)] = None
+        path, total_cost = self.tracked_routes()[(start, goal)]
+        if path is None:
+            return None, None, f"No path exists from '{format_node_name_for_display(start)}' to '{format_node_name_for_display(goal)}'."
+        return path, total_cost, None
+
+    def untrack_route(self, start, goal):
+        self.tracked.pop((start, goal), None)
+
+    def move_tracked_start(self, start, goal, new_start):
+        """Move a tracked route's start (the user walked on); the planner keeps its state."""
+        planner = self.tracked.pop((start, goal))
+        if planner is not None:
+            planner.move_start(self.compiled.ids[new_start])
+        self.tracked[(new_start, goal)] = planner
+
+    def tracked_routes(self):
+        """Current (path, total_cost) of every tracked route; path is None if unreachable."""
+        cg = self.compiled
+        routes = {}
+        for (start, goal), planner in self.tracked.items():
+            if planner is None:
+                planner = self.tracked[(start, goal)] = DStarLite(cg, cg.ids[start], cg.ids[goal])
+            path_ids, total_cost, _ = planner.plan()
+            routes[(start, goal)] = (cg.path_names(path_ids) if path_ids is not None else None, total_cost)
+        return routes
+
+    def add_node(self, name, position, is_eatery=True):
+        """Add an unconnected node at position (lat, lon). Use connect() to link it."""
+        self.graph[name] = {}
+        self.coordinates[name] = position
+        if not is_eatery:
+            self.non_eatery_nodes.add(name)
+        self.node_name_map[name.lower()] = name
+        # Update the node indexes in place rather than rebuilding them
+        if self._spatial_index is not None:
+            self._spatial_index.add(name, position)
+        if self._name_index is not None:
+            self._name_index.add(name)
+        self.graph_changed(removed_nodes=(), nodes_changed=False) # An unconnected node cannot change any route
+
+    def connect(self, node_a, node_b, cost):
+        """Add (or update) an undirected edge between two existing nodes."""
+        if not cost > 0:
+            raise ValueError("Edge cost must be positive.")
+        self.graph[node_a][node_b] = cost
+        self.graph[node_b][node_a] = cost
+        self.graph_changed(nodes_changed=False)
+
+    def remove_node(self, real_node):
+        """
+        Remove a node and any nodes left disconnected from the main graph.
+        Returns the set of disconnected nodes that were removed as well.
+        """
+        return self.remove_nodes([real_node])
+
+    def remove_nodes(self, nodes):
+        """
+        Remove several nodes at once, then drop everything no longer connected to the
+        primary component (the one holding self.anchor, or else the largest). Connectivity
+        is computed once for the whole batch. Returns the set of disconnected nodes removed
+        in addition to `nodes`.
+        """
+        graph = self.graph
+        removed = {node for node in nodes if node in graph}
+        for node in removed:
+            graph.pop(node)
+        # Remove connections to the removed nodes; one sweep also catches one-way edges
+        for neighbors in graph.values():
+            for node in [neighbor for neighbor in neighbors if neighbor in removed]:
+                del neighbors[node]
+
+        disconnected_nodes = detached_nodes(graph, self.anchor)
+        for node in disconnected_nodes:
+            graph.pop(node, None)
+
+        # Remove disconnected nodes and the target nodes from the other data structures
+        for node in disconnected_nodes | removed:
+            self.coordinates.pop(node, None)
+            self.node_name_map.pop(node.lower(), None)
+            self.non_eatery_nodes.discard(node)
+            if self._spatial_index is not None:
+                self._spatial_index.remove(node)
+            if self._name_index is not None:
+                self._name_index.remove(node)
+        gone = disconnected_nodes | removed
+        for start, goal in [key for key in self.tracked if key[0] in gone or key[1] in gone]:
+            del self.tracked[(start, goal)]
+        self.graph_changed(removed_nodes=gone, nodes_changed=False)
+        return disconnected_nodes
@@ -0,0 +1,369 @@
+import math
+import heapq # Implement priority queue
+from compiled_graph import CLOSED, node_array, reconstruct_path, typecode
+from heuristics import GeoHeuristic
+from priority_queues import HeapQueue, RadixHeap
+
+# Default A* heuristic: calibrated haversine meters
+DEFAULT_HEURISTIC = GeoHeuristic()
+
+# Search kernels over a CompiledGraph. Each takes integer node ids and an optional
+# SearchStats, and returns (path_ids, cost, nodes_visited); path_ids is None when the
+# goal is unreachable. Entries superseded by a cheaper push are skipped when popped.
+# A closed edge in an integer graph weighs CLOSED, so the relaxation loops stay as they
+# are and a goal is unreachable when its cost is still >= CLOSED at the end.
+# uniform_cost_search and a_star allocate their state with node_array(), so on a sparse
+# graph (tiled_graph.TiledGraph) it grows with the nodes reached, not with the map.
+
+# UCS
+def uniform_cost_search(cg, start_id, goal_id, stats=None):
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    track_frontier = stats is not None and stats.counting
+
+    to_visit = []
+    heapq.heappush(to_visit, (0, start_id)) # Push start node to priority queue
+
+    parent = node_array(cg, -1) # Flat parent array indexed by node id
+    cost_so_far = node_array(cg, math.inf)
+    cost_so_far[start_id] = 0
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+
+    while to_visit:
+        if track_frontier and len(to_visit) > max_frontier:
+            max_frontier = len(to_visit)
+        current_cost, current = heapq.heappop(to_visit)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+        if current == goal_id:
+            break
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i] # Cost Accumulation
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                heapq.heappush(to_visit, (new_cost, node))
+                parent[node] = current
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, len(to_visit), max_frontier)
+    if cost_so_far[goal_id] >= CLOSED:
+        return None, None, nodes_visited
+    return reconstruct_path(parent, goal_id), cost_so_far[goal_id], nodes_visited
+
+# A*
+def a_star(cg, start_id, goal_id, stats=None, heuristic=None):
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    h = (heuristic or DEFAULT_HEURISTIC).for_goal(cg, goal_id)
+    track_frontier = stats is not None and stats.counting
+
+    to_visit = []
+    heapq.heappush(to_visit, (h(start_id), 0, start_id)) # Push start node to priority queue
+
+    parent = node_array(cg, -1) # Flat parent array indexed by node id
+    cost_so_far = node_array(cg, math.inf)
+    cost_so_far[start_id] = 0
+    estimates = node_array(cg, -1.0) # Heuristic values, each computed at most once per query
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+
+    while to_visit:
+        if track_frontier and len(to_visit) > max_frontier:
+            max_frontier = len(to_visit)
+        current_priority, current_cost, current = heapq.heappop(to_visit)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+        if current == goal_id:
+            break
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                estimate = estimates[node]
+                if estimate < 0:
+                    estimate = estimates[node] = h(node) # Estimated cost from the neighbor to the goal
+                heapq.heappush(to_visit, (new_cost + estimate, new_cost, node)) # Push node to priority queue
+                parent[node] = current
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, len(to_visit), max_frontier)
+    if cost_so_far[goal_id] >= CLOSED:
+        return None, None, nodes_visited
+    return reconstruct_path(parent, goal_id), cost_so_far[goal_id], nodes_visited
+
+def _max_weight(cg):
+    weight = cg.cache.get("max_weight")
+    if weight is None:
+        weight = cg.cache["max_weight"] = max(cg.weights, default=1)
+    return weight
+
+# UCS or A* on a pluggable priority queue (see priority_queues.py)
+def queue_search(cg, start_id, goal_id, stats=None, queue=HeapQueue, heuristic=None):
+    """
+    Dijkstra, or A* when a heuristic is given, using any queue class from
+    priority_queues.py. Integer-key queues (Dial, radix) need integer edge costs, no
+    heuristic and no closed edges; otherwise the search falls back to HeapQueue. A map
+    with an edge above the queue's max_weight_limit uses RadixHeap instead.
+    """
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    if queue.integer_keys and (heuristic is not None or typecode(weights) != 'q' or _max_weight(cg) >= CLOSED):
+        queue = HeapQueue
+    elif queue.max_weight_limit is not None and _max_weight(cg) > queue.max_weight_limit:
+        queue = RadixHeap
+    h = heuristic.for_goal(cg, goal_id) if heuristic is not None else None
+    track_frontier = stats is not None and stats.counting
+
+    frontier = queue(len(cg), _max_weight(cg))
+    frontier.push(start_id, h(start_id) if h else 0)
+    parent = [-1] * len(cg)
+    cost_so_far = [math.inf] * len(cg)
+    cost_so_far[start_id] = 0
+    estimates = [-1.0] * len(cg) if h else None
+    nodes_visited = 0
+    max_frontier = 0
+    relaxations = 0
+
+    while frontier:
+        if track_frontier:
+            if frontier.entries > max_frontier:
+                max_frontier = frontier.entries
+        _, current = frontier.pop() # Never stale: the queue drops superseded entries itself
+        nodes_visited += 1
+        if current == goal_id:
+            break
+        current_cost = cost_so_far[current]
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                parent[node] = current
+                relaxations += 1
+                if h:
+                    estimate = estimates[node]
+                    if estimate < 0:
+                        estimate = estimates[node] = h(node)
+                    frontier.push(node, new_cost + estimate)
+                else:
+                    frontier.push(node, new_cost)
+
+    if stats is not None:
+        stats.record(nodes_visited, frontier.pops, frontier.entries, max_frontier)
+        if stats.counting:
+            stats.relaxations = relaxations # Key decreases do not always add an entry
+    if cost_so_far[goal_id] >= CLOSED:
+        return None, None, nodes_visited
+    return reconstruct_path(parent, goal_id), cost_so_far[goal_id], nodes_visited
+
+def settle_within(cg, start_id, max_cost=math.inf, stats=None, where=None):
+    """
+    Dijkstra from start_id that stops at max_cost, as a generator: yields
+    (node_id, cost, parent_id) for every node within max_cost, in the order they are
+    settled (cheapest first; parent_id is -1 for the start). `where(node_id)` filters
+    what is yielded, not what is searched, so parents may be nodes that were not yielded.
+    Costs and parents live in dicts, so memory grows with the region reached rather
+    than with the graph. Stats are recorded when the generator finishes or is closed.
+    """
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    track_frontier = stats is not None and stats.counting
+    max_cost = min(max_cost, CLOSED - 1) # Nothing past a closed edge is within reach
+
+    to_visit = [(0, start_id)]
+    parent = {start_id: -1}
+    cost_so_far = {start_id: 0}
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+    try:
+        while to_visit:
+            if track_frontier and len(to_visit) > max_frontier:
+                max_frontier = len(to_visit)
+            current_cost, current = heapq.heappop(to_visit)
+            pops += 1
+            if current_cost > cost_so_far[current]:
+                continue # Stale entry
+            nodes_visited += 1
+            if where is None or where(current):
+                yield current, current_cost, parent[current]
+
+            for i in range(offsets[current], offsets[current + 1]):
+                node = targets[i]
+                new_cost = current_cost + weights[i]
+                if new_cost <= max_cost and new_cost < cost_so_far.get(node, math.inf):
+                    cost_so_far[node] = new_cost
+                    heapq.heappush(to_visit, (new_cost, node))
+                    parent[node] = current
+    finally:
+        if stats is not None:
+            stats.record(nodes_visited, pops, len(to_visit), max_frontier)
+
+def shortest_path_tree(cg, source_id):
+    """
+    Full Dijkstra from source_id. Returns (cost, parent) lists indexed by node id;
+    unreachable nodes have cost math.inf and parent -1, and nodes only reachable over
+    a closed edge have a cost >= CLOSED.
+    """
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    parent = [-1] * len(cg)
+    cost_so_far = [math.inf] * len(cg)
+    cost_so_far[source_id] = 0
+    to_visit = [(0, source_id)]
+    while to_visit:
+        current_cost, current = heapq.heappop(to_visit)
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                heapq.heappush(to_visit, (new_cost, node))
+                parent[node] = current
+    return cost_so_far, parent
+
+def _bidirectional(cg, start_id, goal_id, stats, potential):
+    """
+    Shared loop for the bidirectional searches. Runs a forward search from start over cg
+    and a backward search from goal over cg.reversed(), expanding the side with the
+    smaller frontier. `potential(v)` shifts forward keys by +p(v) and backward keys by
+    -p(v); with p = 0 this is bidirectional Dijkstra. Either way the keys are reduced
+    costs of a consistent potential, so the search can stop as soon as the two top keys
+    add up to the best start-goal cost seen through an edge between the two sides.
+    """
+    n = len(cg)
+    if start_id == goal_id:
+        if stats is not None:
+            stats.record(1, 1, 0, 1)
+        return [start_id], 0, 1
+
+    graphs = (cg, cg.reversed())
+    costs = ([math.inf] * n, [math.inf] * n)
+    parents = ([-1] * n, [-1] * n)
+    signs = (1, -1) # The backward search uses the negated potential
+    costs[0][start_id] = 0
+    costs[1][goal_id] = 0
+    frontiers = ([(potential(start_id), 0, start_id)], [(-potential(goal_id), 0, goal_id)])
+    track_frontier = stats is not None and stats.counting
+
+    best_cost = math.inf # Cost of the best start-goal path found so far
+    meeting_node = -1
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+
+    while frontiers[0] and frontiers[1]:
+        if frontiers[0][0][0] + frontiers[1][0][0] >= best_cost:
+            break # No unexplored path can beat best_cost
+        if track_frontier and len(frontiers[0]) + len(frontiers[1]) > max_frontier:
+            max_frontier = len(frontiers[0]) + len(frontiers[1])
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        frontier = frontiers[side]
+        cost_so_far = costs[side]
+        other_cost = costs[1 - side]
+        parent = parents[side]
+        sign = signs[side]
+        offsets, targets, weights = graphs[side].offsets, graphs[side].targets, graphs[side].weights
+
+        current_key, current_cost, current = heapq.heappop(frontier)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                heapq.heappush(frontier, (new_cost + sign * potential(node), new_cost, node))
+                parent[node] = current
+            # Every edge that reaches the other side's tree gives a candidate path
+            through = new_cost + other_cost[node]
+            if through < best_cost:
+                best_cost = through
+                meeting_node = node
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, len(frontiers[0]) + len(frontiers[1]), max_frontier, initial_pushes=2)
+    if meeting_node == -1 or best_cost >= CLOSED:
+        return None, None, nodes_visited
+    # Forward half ends at the meeting node; the backward parents lead on to the goal
+    path = reconstruct_path(parents[0], meeting_node)
+    current = parents[1][meeting_node]
+    while current != -1:
+        path.append(current)
+        current = parents[1][current]
+    return path, best_cost, nodes_visited
+
+def bidirectional_dijkstra(cg, start_id, goal_id, stats=None):
+    return _bidirectional(cg, start_id, goal_id, stats, lambda node_id: 0)
+
+def bidirectional_a_star(cg, start_id, goal_id, stats=None, heuristic=None):
+    """
+    Bidirectional A* with the average potential p(v) = (h_goal(v) - h_start(v)) / 2,
+    where h_start estimates the cost from start to v (computed on the reversed graph).
+    The average of two consistent heuristics is consistent, which keeps the simple
+    bidirectional stopping rule exact.
+    """
+    heuristic = heuristic or DEFAULT_HEURISTIC
+    to_goal = heuristic.for_goal(cg, goal_id)
+    from_start = heuristic.for_goal(cg.reversed(), start_id)
+    estimates = [None] * len(cg)
+
+    def potential(node_id):
+        value = estimates[node_id]
+        if value is None:
+            value = estimates[node_id] = (to_goal(node_id) - from_start(node_id)) / 2
+        return value
+    return _bidirectional(cg, start_id, goal_id, stats, potential)
+
+def nearest_targets(cg, start_id, target_ids, k=1, stats=None):
+    """
+    One Dijkstra from start_id that stops as soon as the k-th node of target_ids is settled.
+    Returns ([(target_id, cost, path_ids), ...] nearest first, nodes_visited).
+    """
+    offsets, targets, weights = cg.offsets, cg.targets, cg.weights
+    track_frontier = stats is not None and stats.counting
+
+    to_visit = [(0, start_id)]
+    parent = [-1] * len(cg)
+    cost_so_far = [math.inf] * len(cg)
+    cost_so_far[start_id] = 0
+    found = []
+    nodes_visited = 0
+    pops = 0
+    max_frontier = 0
+
+    while to_visit and len(found) < k:
+        if track_frontier and len(to_visit) > max_frontier:
+            max_frontier = len(to_visit)
+        current_cost, current = heapq.heappop(to_visit)
+        pops += 1
+        if current_cost > cost_so_far[current]:
+            continue # Stale entry
+        nodes_visited += 1
+        if current in target_ids:
+            found.append((current, current_cost))
+            if len(found) == k:
+                break
+
+        for i in range(offsets[current], offsets[current + 1]):
+            node = targets[i]
+            new_cost = current_cost + weights[i]
+            if new_cost < cost_so_far[node]:
+                cost_so_far[node] = new_cost
+                heapq.heappush(to_visit, (new_cost, node))
+                parent[node] = current
+
+    if stats is not None:
+        stats.record(nodes_visited, pops, len(to_visit), max_frontier)
+    return [(target, cost, reconstruct_path(parent, target)) for target, cost in found if cost < CLOSED], nodes_visited
@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+from instrumentation import SearchStats, summarize
+from router import Router
+
+# Asyncio HTTP/JSON front end for a Router, with no dependencies beyond the standard
+# library. The event loop only parses requests and writes responses; every piece of work
+# that touches the router (searches and edits alike) goes through one bounded FIFO queue
+# and runs on a single executor thread, so the router is never used from two threads and
+# edits are applied in the order they arrived. Identical route and nearest requests that
+# are still queued or running share one computation. When the queue is full the server
+# answers 503 instead of letting work pile up.
+#
+#   python server.py --port 8080
+#   curl 'http://127.0.0.1:8080/route?start=sherwood%20place&goal=jollibee&algorithm=astar'
+#
+# Endpoints (parameters as query string or JSON body):
+#   GET    /route    start, goal[, algorithm]
+#   GET    /nearest  start[, k]
+#   GET    /suggest  q[, limit]
+#   POST   /nodes    name, lat, lon[, eatery][, edges: {neighbor: cost}]
+#   POST   /edges    a, b, cost
+#   PATCH  /edges    a, b, cost or closed: true (reweights in place, see Router.update_edge_costs)
+#   DELETE /nodes    name (also removes nodes left disconnected)
+#   GET    /metrics  latency, queue depth, coalescing and cache counters
+#   GET    /health
+
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class Busy(Exception):
+    """The work queue is full."""
+
+class RequestError(Exception):
+    """A request the client has to fix; becomes a 400 response."""
+
+class Metrics:
+    """Request counts and a rolling window of latencies per endpoint."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.requests = Counter()
+        self.errors = Counter()
+        self.latencies = {}
+        self.computations = 0 # Jobs actually run on the executor
+        self.coalesced = 0    # Requests answered by joining another request's job
+        self.rejected = 0     # Requests refused with 503 because the queue was full
+        self.started = time.time()
+
+    def observe(self, endpoint, seconds, status):
+        self.requests[endpoint] += 1
+        if status >= 400:
+            self.errors[endpoint] += 1
+        self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def snapshot(self):
+        return {
+            "uptime": time.time() - self.started,
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "latency": {endpoint: summarize(values) for endpoint, values in self.latencies.items()},
+            "computations": self.computations,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    return (head + "\r\n").encode("ascii") + body
+
+def _text(params, key, required=True):
+    value = params.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise RequestError(f"Missing parameter '{key}'.")
+        return None
+    return str(value)
+
+def _number(params, key, kind=float, default=None):
+    value = params.get(key, default)
+    if value is None:
+        raise RequestError(f"Missing parameter '{key}'.")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"Parameter '{key}' must be a number.")
+
+def _cost(params, key="cost", closable=False):
+    """
+    Positive edge cost parameter, as an int when whole. NaN is always rejected, and
+    infinity (a closed edge) unless closable.
+    """
+    cost = _number(params, key)
+    if not (cost > 0 and (closable or math.isfinite(cost))):
+        raise RequestError("Edge cost must be a positive number." if closable else "Edge cost must be a positive, finite number.")
+    return int(cost) if cost.is_integer() else cost
+
+def _flag(params, key, default=True):
+    value = params.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "y", "yes", "true", "t")
+    return bool(value)
+
+def _mark_retrieved(future):
+    """Done callback for shared jobs: a failure nobody awaited anymore is not an error."""
+    if not future.cancelled():
+        future.exception()
+
+class RouteServer:
+    """
+    Serves one Router over HTTP. `queue_size` bounds the jobs waiting for the executor;
+    `await start()` binds the socket and `await close()` stops everything.
+    """
+
+    def __init__(self, router, host="127.0.0.1", port=8080, queue_size=64):
+        self.router = router
+        self.host = host
+        self.port = port
+        self.metrics = Metrics()
+        self.queue = asyncio.Queue(queue_size)
+        self.in_flight = {}  # coalescing key -> future of the job computing it
+        self.edits = 0       # Edits submitted so far; part of every coalescing key
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="router")
+        self._server = None
+        self._worker = None
+        self._routes = {
+            ("GET", "/route"): self._route,
+            ("GET", "/nearest"): self._nearest,
+            ("GET", "/suggest"): self._suggest,
+            ("POST", "/nodes"): self._add_node,
+            ("POST", "/edges"): self._add_edge,
+            ("PATCH", "/edges"): self._update_edge,
+            ("DELETE", "/nodes"): self._remove_node,
+            ("GET", "/metrics"): self._metrics,
+            ("GET", "/health"): self._health,
+        }
+
+    async def start(self):
+        self._worker = asyncio.create_task(self._run_jobs())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1] # Actual port when 0 was asked for
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=True)
+
+    # Work queue
+
+    def _submit(self, function, *args):
+        """Queue a job for the executor thread and return its future; raises Busy when full."""
+        if self.queue.full():
+            self.metrics.rejected += 1
+            raise Busy()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((future, function, args))
+        return future
+
+    async def _run_jobs(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            future, function, args = await self.queue.get()
+            if future.cancelled():
+                continue
+            self.metrics.computations += 1
+            try:
+                result = await loop.run_in_executor(self._executor, function, *args)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    async def _coalesced(self, key, function, *args):
+        """
+        Run a read-only job, sharing it with any identical job still queued or running.
+        Returns (result, coalesced).
+        """
+        key = (self.edits,) + key # Never join a job queued before the latest edit
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(future), True
+        future = self._submit(function, *args)
+        self.in_flight[key] = future
+
+        future.add_done_callback(lambda finished: self.in_flight.pop(key, None))
+        future.add_done_callback(_mark_retrieved)
+        return await asyncio.shield(future), False
+
+    async def _edit(self, function, *args):
+        """Run an edit job; it is applied even if the client disconnects while it waits."""
+        self.edits += 1
+        future = self._submit(function, *args)
+        future.add_done_callback(_mark_retrieved)
+        return await asyncio.shield(future)
+
+    # Jobs (run on the executor thread)
+
+    def _route_job(self, algorithm, user_start, user_goal):
+        router = self.router
+        start = router.locate(user_start)
+        goal = router.resolve(user_goal)
+        stats = SearchStats()
+        path, total_cost, error, nodes_visited, elapsed_time, _ = router.search(algorithm, start, goal, user_start, user_goal, stats)
+        result = {
+            "start": start,
+            "goal": goal,
+            "algorithm": algorithm,
+            "path": path,
+            "cost": total_cost,
+            "nodes_visited": nodes_visited,
+            "elapsed_time": elapsed_time,
+            "cache_hit": stats.cache_hit,
+            "error": error,
+        }
+        if start is None:
+            result["suggestions"] = router.suggest(user_start)
+        elif goal is None:
+            result["suggestions"] = router.suggest(user_goal)
+        return result
+
+    def _nearest_job(self, user_start, k):
+        router = self.router
+        start = router.locate(user_start)
+        results, error, nodes_visited, elapsed_time, _ = router.nearest_eateries(start, k, user_start=user_start)
+        return {
+            "start": start,
+            "eateries": [{"name": eatery, "path": path, "cost": total_cost} for eatery, path, total_cost in results or ()],
+            "nodes_visited": nodes_visited,
+            "elapsed_time": elapsed_time,
+            "error": error,
+            "suggestions": router.suggest(user_start) if start is None else [],
+        }
+
+    def _add_node_job(self, name, position, is_eatery, edges):
+        router = self.router
+        if router.resolve(name) is not None:
+            raise RequestError(f"Node '{name}' already exists.")
+        neighbors = {}
+        for neighbor, cost in edges.items():
+            node = router.resolve(neighbor)
+            if node is None:
+                raise RequestError(f"Node '{neighbor}' does not exist in the graph.")
+            neighbors[node] = cost
+        router.add_node(name, position, is_eatery)
+        for node, cost in neighbors.items():
+            router.connect(name, node, cost)
+        return {"name": name, "edges": neighbors, "version": router.version}
+
+    def _add_edge_job(self, user_a, user_b, cost):
+        router = self.router
+        a, b = router.resolve(user_a), router.resolve(user_b)
+        if a is None or b is None:
+            raise RequestError(f"Node '{user_a if a is None else user_b}' does not exist in the graph.")
+        router.connect(a, b, cost)
+        return {"a": a, "b": b, "cost": cost, "version": router.version}
+
+    def _update_edge_job(self, user_a, user_b, cost):
+        router = self.router
+        a, b = router.resolve(user_a), router.resolve(user_b)
+        if a is None or b is None:
+            raise RequestError(f"Node '{user_a if a is None else user_b}' does not exist in the graph.")
+        try:
+            changed = router.update_edge_costs([(a, b, cost)])
+        except ValueError as error:
+            raise RequestError(str(error))
+        return {
+            "a": a,
+            "b": b,
+            "cost": None if cost == math.inf else cost, # JSON has no infinity
+            "closed": cost == math.inf,
+            "version": router.version,
+            "changed_routes": [{"start": start, "goal": goal, "path": path, "cost": total_cost}
+                               for (start, goal), (path, total_cost) in changed.items()],
+        }
+
+    def _remove_node_job(self, user_name):
+        router = self.router
+        node = router.resolve(user_name)
+        if node is None:
+            raise RequestError(f"Node '{user_name}' does not exist in the graph.")
+        disconnected = router.remove_node(node)
+        return {"removed": node, "disconnected": sorted(disconnected), "version": router.version}
+
+    # Endpoint handlers: params -> (status, payload)
+
+    async def _route(self, params):
+        algorithm = _text(params, "algorithm", required=False) or "ucs"
+        start, goal = _text(params, "start"), _text(params, "goal")
+        key = ("route", algorithm, start.strip().lower(), goal.strip().lower())
+        result, coalesced = await self._coalesced(key, self._route_job, algorithm, start, goal)
+        return (400 if result["error"] else 200), dict(result, coalesced=coalesced)
+
+    async def _nearest(self, params):
+        start = _text(params, "start")
+        k = _number(params, "k", int, 1)
+        result, coalesced = await self._coalesced(("nearest", start.strip().lower(), k), self._nearest_job, start, k)
+        return (400 if result["error"] else 200), dict(result, coalesced=coalesced)
+
+    async def _suggest(self, params):
+        text = _text(params, "q")
+        limit = _number(params, "limit", int, 5)
+        result, _ = await self._coalesced(("suggest", text.strip().lower(), limit), self.router.suggest, text, limit)
+        return 200, {"q": text, "suggestions": result}
+
+    async def _add_node(self, params):
+        name = _text(params, "name").strip()
+        position = (_number(params, "lat"), _number(params, "lon"))
+        edges = params.get("edges") or {}
+        if not isinstance(edges, dict):
+            raise RequestError("'edges' must map neighbor names to costs.")
+        edges = {neighbor: _cost(edges, neighbor) for neighbor in edges}
+        return 201, await self._edit(self._add_node_job, name, position, _flag(params, "eatery"), edges)
+
+    async def _add_edge(self, params):
+        cost = _cost(params)
+        return 200, await self._edit(self._add_edge_job, _text(params, "a"), _text(params, "b"), cost)
+
+    async def _update_edge(self, params):
+        if _flag(params, "closed", default=False):
+            cost = math.inf
+        else:
+            cost = _cost(params, closable=True) # cost=inf closes the edge like closed=true
+        return 200, await self._edit(self._update_edge_job, _text(params, "a"), _text(params, "b"), cost)
+
+    async def _remove_node(self, params):
+        return 200, await self._edit(self._remove_node_job, _text(params, "name"))
+
+    async def _metrics(self, params):
+        snapshot = self.metrics.snapshot()
+        snapshot["queue_depth"] = self.queue.qsize()
+        snapshot["queue_size"] = self.queue.maxsize
+        snapshot["in_flight"] = len(self.in_flight)
+        if self.router.route_cache is not None:
+            snapshot["route_cache"] = self.router.route_cache.stats()
+        return 200, snapshot
+
+    async def _health(self, params):
+        return 200, {"status": "ok", "nodes": len(self.router), "version": self.router.version}
+
+    # HTTP
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self._routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self._routes):
+                return 405, {"error": f"Method {method} is not allowed on {url.path}."}
+            return 404, {"error": f"No endpoint {url.path}."}
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return 400, {"error": "Request body is not valid JSON."}
+            if not isinstance(data, dict):
+                return 400, {"error": "Request body must be a JSON object."}
+            params.update(data)
+        try:
+            return await handler(params)
+        except RequestError as error:
+            return 400, {"error": str(error)}
+        except Busy:
+            return 503, {"error": "Server is busy; retry shortly.", "queue_size": self.queue.maxsize}
+        except Exception as error:
+            return 500, {"error": f"{type(error).__name__}: {error}"}
+
+    async def _read_request(self, reader):
+        """Returns (method, target, headers, body), None at end of stream; raises ValueError if malformed."""
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line.")
+        method, target, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise OverflowError()
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except OverflowError:
+                    writer.write(_response(413, {"error": "Request body too large."}, False))
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(_response(400, {"error": "Malformed HTTP request."}, False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                started = time.perf_counter()
+                status, payload = await self._dispatch(method, target, body)
+                path = urlsplit(target).path
+                endpoint = f"{method} {path}" if (method, path) in self._routes else "other"
+                self.metrics.observe(endpoint, time.perf_counter() - started, status)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(router, host, port, queue_size):
+    server = RouteServer(router, host, port, queue_size)
+    await server.start()
+    print(f"Serving {len(router)} nodes on http://{server.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve routing queries over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind (default 127.0.0.1, local only)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default 8080)")
+    parser.add_argument("--queue-size", type=int, default=64, help="jobs allowed to wait before answering 503 (default 64)")
+    parser.add_argument("--map", help="map file to serve (see graph_io.load_map; default: the campus map)")
+    parser.add_argument("--edges", help="edges file when --map is a CSV nodes file")
+    args = parser.parse_args(argv)
+    router = Router.load(args.map, args.edges) if args.map else Router()
+    try:
+        asyncio.run(serve(router, args.host, args.port, args.queue_size))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
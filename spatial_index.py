@@ -0,0 +1,126 @@
+import math
+from heuristics import EARTH_RADIUS_METERS
+
+# Uniform grid over node coordinates for snapping raw positions to nodes. Positions are
+# projected to local metres (equirectangular around a fixed reference latitude, accurate
+# over campus and city extents) and bucketed into square cells, so a lookup only looks at
+# the cells around the query instead of every node. Nodes can be added and removed one at
+# a time, which keeps the index in step with Router edits.
+
+class GridIndex:
+    """
+    Nearest-node and within-radius lookups over (lat, lon) positions.
+    Distances are in metres. Cells should be about the typical spacing between nodes.
+    """
+
+    def __init__(self, coordinates=None, cell_meters=100.0, reference_lat=None):
+        if reference_lat is None:
+            lats = [lat for lat, lon in (coordinates or {}).values() if math.isfinite(lat)]
+            reference_lat = sum(lats) / len(lats) if lats else 0.0
+        self.cell_meters = cell_meters
+        self._x_scale = EARTH_RADIUS_METERS * math.cos(math.radians(reference_lat))
+        self._cells = {}      # (cx, cy) -> {node: (x, y)}
+        self._positions = {}  # node -> (x, y)
+        # Occupied cell range; only ever grows, which keeps lookups correct after removals
+        self._bounds = None
+        for node, position in (coordinates or {}).items():
+            self.add(node, position)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, node):
+        return node in self._positions
+
+    def _project(self, lat, lon):
+        return math.radians(lon) * self._x_scale, math.radians(lat) * EARTH_RADIUS_METERS
+
+    def _cell(self, x, y):
+        return int(x // self.cell_meters), int(y // self.cell_meters)
+
+    def add(self, node, position):
+        """Index node at position (lat, lon), replacing any earlier position."""
+        lat, lon = position
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return
+        self.remove(node)
+        x, y = self._project(lat, lon)
+        cell = self._cell(x, y)
+        self._cells.setdefault(cell, {})[node] = (x, y)
+        self._positions[node] = (x, y)
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], cell[0]), min(bounds[1], cell[1])
+            bounds[2], bounds[3] = max(bounds[2], cell[0]), max(bounds[3], cell[1])
+
+    def remove(self, node):
+        position = self._positions.pop(node, None)
+        if position is None:
+            return
+        cell = self._cell(*position)
+        bucket = self._cells[cell]
+        del bucket[node]
+        if not bucket:
+            del self._cells[cell]
+
+    def _ring(self, cx, cy, r):
+        """Occupied buckets whose cell is exactly r cells (Chebyshev) from (cx, cy)."""
+        cells = self._cells
+        if r == 0:
+            bucket = cells.get((cx, cy))
+            if bucket:
+                yield bucket
+            return
+        for dx in range(-r, r + 1):
+            for dy in (-r, r) if abs(dx) != r else range(-r, r + 1):
+                bucket = cells.get((cx + dx, cy + dy))
+                if bucket:
+                    yield bucket
+
+    def nearest(self, lat, lon, k=1, where=None):
+        """
+        The k nodes closest to (lat, lon), as [(distance, node), ...] nearest first.
+        `where` optionally restricts the answer to nodes a predicate accepts.
+        """
+        if not self._positions or k < 1:
+            return []
+        x, y = self._project(lat, lon)
+        cx, cy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self._bounds
+        # Rings closer than the occupied range are empty, so start at its edge
+        first = max(min_x - cx, cx - max_x, min_y - cy, cy - max_y, 0)
+        last = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+        found = []
+        for r in range(first, last + 1):
+            for bucket in self._ring(cx, cy, r):
+                for node, (nx, ny) in bucket.items():
+                    if where is None or where(node):
+                        found.append((math.hypot(nx - x, ny - y), node))
+            if len(found) >= k:
+                found.sort(key=lambda item: item[0])
+                del found[k:]
+                # Anything in ring r + 1 or beyond is at least r cells away
+                if found[-1][0] <= r * self.cell_meters:
+                    break
+        found.sort(key=lambda item: item[0])
+        return found[:k]
+
+    def within(self, lat, lon, radius):
+        """All nodes within radius metres of (lat, lon), as [(distance, node), ...] nearest first."""
+        if not self._positions:
+            return []
+        x, y = self._project(lat, lon)
+        low_x, low_y = self._cell(x - radius, y - radius)
+        high_x, high_y = self._cell(x + radius, y + radius)
+        min_x, min_y, max_x, max_y = self._bounds
+        found = []
+        for cx in range(max(low_x, min_x), min(high_x, max_x) + 1):
+            for cy in range(max(low_y, min_y), min(high_y, max_y) + 1):
+                for node, (nx, ny) in self._cells.get((cx, cy), {}).items():
+                    distance = math.hypot(nx - x, ny - y)
+                    if distance <= radius:
+                        found.append((distance, node))
+        found.sort(key=lambda item: item[0])
+        return found
@@ -0,0 +1,108 @@
+import math
+import random
+from components import detached_nodes
+from heuristics import EARTH_RADIUS_METERS
+
+# Seeded synthetic maps for benchmarking, from a hundred nodes to a million. Every
+# generator returns (graph, coordinates, non_eatery_nodes) like the loaders in graph_io.py:
+# integer edge costs in metres (times a detour or speed factor), coordinates around the
+# campus, and a fixed fraction of nodes marked as eateries. Only the largest connected
+# component is kept, so any two nodes of a generated map have a route between them.
+
+ORIGIN = (14.5645, 120.9932) # Campus centre (lat, lon)
+DEGREES_PER_METER = 180 / (math.pi * EARTH_RADIUS_METERS)
+
+def _to_lat_lon(x, y):
+    """Position x metres east and y metres north of ORIGIN as (lat, lon)."""
+    lat = ORIGIN[0] + y * DEGREES_PER_METER
+    lon = ORIGIN[1] + x * DEGREES_PER_METER / math.cos(math.radians(ORIGIN[0]))
+    return lat, lon
+
+def _finish(graph, points, rng, eatery_fraction):
+    """Drop detached nodes, convert positions and pick the eateries."""
+    for node in detached_nodes(graph):
+        del graph[node]
+    coordinates = {node: _to_lat_lon(*points[node]) for node in graph}
+    non_eatery_nodes = {node for node in graph if rng.random() >= eatery_fraction}
+    return graph, coordinates, non_eatery_nodes
+
+def _connect(graph, points, a, b, factor):
+    (ax, ay), (bx, by) = points[a], points[b]
+    cost = max(1, round(math.hypot(ax - bx, ay - by) * factor))
+    graph[a][b] = cost
+    graph[b][a] = cost
+
+def grid_map(n, seed=0, spacing=50.0, eatery_fraction=0.1):
+    """Square 4-connected grid of about n nodes, edge costs 1-1.3x the straight-line length."""
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    points = {}
+    graph = {}
+    for row in range(side):
+        for col in range(side):
+            node = f"g{row}_{col}"
+            points[node] = (col * spacing, row * spacing)
+            graph[node] = {}
+            if col:
+                _connect(graph, points, f"g{row}_{col - 1}", node, rng.uniform(1.0, 1.3))
+            if row:
+                _connect(graph, points, f"g{row - 1}_{col}", node, rng.uniform(1.0, 1.3))
+    return _finish(graph, points, rng, eatery_fraction)
+
+def geometric_map(n, seed=0, degree=6.0, density=400.0, eatery_fraction=0.1):
+    """
+    Random geometric graph: n points uniform in a square with `density` points per km²,
+    each joined to every point within the radius giving an expected `degree` neighbours.
+    """
+    rng = random.Random(seed)
+    side = math.sqrt(n / density) * 1000
+    radius = math.sqrt(degree / (math.pi * density)) * 1000
+    points = {f"r{i}": (rng.uniform(0, side), rng.uniform(0, side)) for i in range(n)}
+    graph = {node: {} for node in points}
+    # Bucket by radius-sized cells so each point is only compared with nearby ones
+    cells = {}
+    for node, (x, y) in points.items():
+        cells.setdefault((int(x // radius), int(y // radius)), []).append(node)
+    for (cx, cy), nodes in cells.items():
+        nearby = [other for dx in (-1, 0, 1) for dy in (-1, 0, 1) for other in cells.get((cx + dx, cy + dy), ())]
+        for node in nodes:
+            x, y = points[node]
+            for other in nearby:
+                if other < node:
+                    ox, oy = points[other]
+                    if (ox - x) ** 2 + (oy - y) ** 2 <= radius * radius:
+                        _connect(graph, points, node, other, rng.uniform(1.0, 1.2))
+    return _finish(graph, points, rng, eatery_fraction)
+
+def road_map(n, seed=0, spacing=80.0, arterial_every=8, drop=0.2, eatery_fraction=0.1):
+    """
+    Road-like network: a jittered grid of streets with a fraction of local segments
+    missing (dead ends, blocks), and every `arterial_every`-th street an arterial that is
+    cheaper per metre, so shortest routes detour onto main roads as in a real city.
+    """
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    points = {}
+    graph = {}
+    for row in range(side):
+        for col in range(side):
+            node = f"s{row}_{col}"
+            jitter = spacing * 0.3
+            points[node] = (col * spacing + rng.uniform(-jitter, jitter), row * spacing + rng.uniform(-jitter, jitter))
+            graph[node] = {}
+            for arterial, previous in ((row % arterial_every == 0, f"s{row}_{col - 1}" if col else None),
+                                       (col % arterial_every == 0, f"s{row - 1}_{col}" if row else None)):
+                if previous is None:
+                    continue
+                if arterial:
+                    _connect(graph, points, previous, node, rng.uniform(0.6, 0.7))
+                elif rng.random() >= drop:
+                    _connect(graph, points, previous, node, rng.uniform(1.0, 1.5))
+    return _finish(graph, points, rng, eatery_fraction)
+
+# Generators by name, as used by benchmark.py
+GENERATORS = {
+    "grid": grid_map,
+    "geometric": geometric_map,
+    "road": road_map,
+}
@@ -0,0 +1,493 @@
+import bisect
+import heapq
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict
+from compiled_graph import typecode
+from graph_io import BYTE_ORDER_MARK, is_snapshot, map_snapshot
+from heuristics import EARTH_RADIUS_METERS, GeoHeuristic
+
+# Partitioned on-disk graph for maps that do not fit in memory. The map is cut into square
+# spatial tiles by node coordinates; each tile's nodes get consecutive ids and are stored
+# in their own file as CSR slices (global offsets, targets, weights) plus coordinates,
+# eatery flags and names. A TiledGraph opens tiles with mmap when a search first touches
+# one of their nodes or edges and keeps at most `max_tiles` of them (least recently used
+# are dropped), so memory depends on the area a query explores, not on the map size.
+#
+# TiledGraph has the attributes the search kernels read from a CompiledGraph (offsets,
+# targets, weights, lat, lon, names, ids, cache, len()), so uniform_cost_search and a_star
+# run on it unchanged. It is `sparse`, so their per-query state lives in dicts holding only
+# the nodes reached (compiled_graph.node_array). Only outgoing edges are stored, so
+# algorithms that need cg.reversed() (bidirectional, CH, D* Lite) or a scan of the whole
+# graph do not apply.
+#
+# Building reads a snapshot through mmap (graph_io.map_snapshot) in a few passes, keeping
+# about 24 bytes per node plus one tile in memory, so the map itself never has to fit.
+# Other map formats are loaded whole first; convert them once with graph_io.py.
+#
+#   python tiled_graph.py build city.snapshot city-tiles --tile-meters 1000
+#   python tiled_graph.py route city-tiles "sherwood place" "jollibee" --algorithm astar
+#
+# Files (native byte order, checked with a byte-order mark):
+#   index.bin     header (magic "CSTI", version, mark, weight typecode, nodes, edges, tiles,
+#                 tile size in degrees, calibrated A* scales), then per tile its row, column,
+#                 first node id and first edge index, followed by one end entry
+#   names.bin     header, then all node names in byte order (lower-cased) as offsets, ids
+#                 and a UTF-8 blob, for binary search without loading any tile
+#   tile-<k>.bin  header, offsets (count + 1), targets, weights, lat, lon, eatery bytes
+#                 (padded to 8), UTF-8 names joined by "\n"
+
+INDEX_MAGIC = b"CSTI"
+NAMES_MAGIC = b"CSTN"
+TILE_MAGIC = b"CSTT"
+FORMAT_VERSION = 1
+INDEX_HEADER = struct.Struct("=4sHHcxxxQQQdddd")
+NAMES_HEADER = struct.Struct("=4sHxxQQ")
+TILE_HEADER = struct.Struct("=4sHxxQQQ")
+TILE_ENTRY = struct.Struct("=qqqq")
+# Metrics whose GeoHeuristic scale is stored, so A* never scans the whole graph for it
+SCALED_METRICS = ("haversine", "equirectangular")
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+# Names sorted in memory at once while building names.bin; longer maps are merged from runs
+NAME_RUN = 1 << 20
+NAME_RECORD = struct.Struct("=qq") # Node id and name length, in spilled runs
+
+def _padded(size):
+    return (size + 7) // 8 * 8
+
+def _spill(run, directory):
+    # One sorted run of (name, id) pairs, written to a temporary file
+    f = tempfile.TemporaryFile(dir=directory)
+    for name, node in run:
+        f.write(NAME_RECORD.pack(node, len(name)))
+        f.write(name)
+    f.seek(0)
+    return f
+
+def _read_run(f):
+    with f:
+        while True:
+            record = f.read(NAME_RECORD.size)
+            if not record:
+                return
+            node, length = NAME_RECORD.unpack(record)
+            yield f.read(length), node
+
+def _sorted_names(cg, new_id, directory):
+    """
+    (lower-cased UTF-8 name, new id) of every node in byte order. Runs of NAME_RUN names
+    are sorted in memory; all but the last are spilled to temporary files and merged.
+    """
+    runs = []
+    run = []
+    for old in range(len(cg)):
+        run.append((str(cg.names[old]).lower().encode("utf-8"), new_id[old]))
+        if len(run) == NAME_RUN:
+            run.sort()
+            runs.append(_spill(run, directory))
+            run = []
+    run.sort()
+    return heapq.merge(*(_read_run(f) for f in runs), run)
+
+def build_tiles(cg, directory, non_eatery_nodes=(), tile_meters=1000, progress=None):
+    """
+    Write cg as a tiled graph into `directory` (created if needed), with tiles about
+    tile_meters on a side. Node ids are renumbered tile by tile. Nodes without
+    coordinates share one extra tile. Eatery flags come from cg.eatery when it is set,
+    otherwise from non_eatery_nodes. `progress(done, total)` is called per tile.
+    Returns the number of tiles written.
+
+    cg is only read in passes, and the working memory is a few arrays of 8 bytes per
+    node, one tile and NAME_RUN names, so cg can be a graph_io.map_snapshot() of a map
+    larger than memory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    n = len(cg)
+    lat, lon = cg.lat, cg.lon
+    known = 0
+    lat_sum = 0.0
+    for i in range(n):
+        if not math.isnan(lat[i]) and not math.isnan(lon[i]):
+            known += 1
+            lat_sum += lat[i]
+    reference_lat = lat_sum / known if known else 0.0
+    lat_step = tile_meters / METERS_PER_DEGREE
+    lon_step = lat_step / max(math.cos(math.radians(reference_lat)), 0.01)
+
+    def tile_key(i):
+        if math.isnan(lat[i]) or math.isnan(lon[i]):
+            return (1 << 62, 1 << 62) # Sorts after every real tile
+        return (math.floor(lat[i] / lat_step), math.floor(lon[i] / lon_step))
+
+    # Tile of every node, numbered by first appearance, then the tiles in key order
+    slots = {}
+    counts = []
+    slot_of = array('q', bytes(8 * n))
+    for i in range(n):
+        key = tile_key(i)
+        slot = slots.get(key)
+        if slot is None:
+            slot = slots[key] = len(counts)
+            counts.append(0)
+        counts[slot] += 1
+        slot_of[i] = slot
+    keys = sorted(slots)
+    rank = array('q', bytes(8 * len(keys)))
+    firsts = array('q', [0]) # First new id per tile, then n
+    for index, key in enumerate(keys):
+        rank[slots[key]] = index
+        firsts.append(firsts[-1] + counts[slots[key]])
+
+    # Counting sort by tile, keeping the old order within a tile
+    fill = firsts[:-1]
+    new_id = array('q', bytes(8 * n))
+    order = array('q', bytes(8 * n))
+    for old in range(n):
+        tile = rank[slot_of[old]]
+        new = fill[tile]
+        fill[tile] = new + 1
+        new_id[old] = new
+        order[new] = old
+    del slot_of, fill
+
+    weight_code = typecode(cg.weights)
+    entries = []
+    first_edge = 0
+    for index, (row, col) in enumerate(keys):
+        members = order[firsts[index]:firsts[index + 1]]
+        offsets = array('q', [first_edge])
+        targets = array('q')
+        weights = array(weight_code)
+        for old in members:
+            lo, hi = cg.offsets[old], cg.offsets[old + 1]
+            targets.extend(new_id[target] for target in cg.targets[lo:hi])
+            weights.extend(cg.weights[lo:hi])
+            offsets.append(first_edge + len(targets))
+        tile_lat = array('d', (lat[old] for old in members))
+        tile_lon = array('d', (lon[old] for old in members))
+        if cg.eatery is not None:
+            eatery = bytes(cg.eatery[old] for old in members)
+        else:
+            eatery = bytes(0 if cg.names[old] in non_eatery_nodes else 1 for old in members)
+        names = "\n".join(str(cg.names[old]) for old in members).encode("utf-8")
+        with open(os.path.join(directory, f"tile-{index}.bin"), "wb") as f:
+            f.write(TILE_HEADER.pack(TILE_MAGIC, FORMAT_VERSION, len(members), len(targets), len(names)))
+            for values in (offsets, targets, weights, tile_lat, tile_lon):
+                values.tofile(f)
+            f.write(eatery.ljust(_padded(len(eatery)), b"\0"))
+            f.write(names)
+        entries.append((row, col, firsts[index], first_edge))
+        first_edge += len(targets)
+        if progress is not None:
+            progress(index + 1, len(keys))
+    del order
+
+    # Name index: lower-cased names in byte order, so lookups can bisect the mapped file.
+    # The blob goes to a temporary file first, since the offsets and ids come before it.
+    name_offsets = array('q', [0])
+    ids = array('q')
+    with tempfile.TemporaryFile(dir=directory) as blob:
+        for name, node in _sorted_names(cg, new_id, directory):
+            blob.write(name)
+            name_offsets.append(name_offsets[-1] + len(name))
+            ids.append(node)
+        blob.seek(0)
+        with open(os.path.join(directory, "names.bin"), "wb") as f:
+            f.write(NAMES_HEADER.pack(NAMES_MAGIC, FORMAT_VERSION, n, name_offsets[-1]))
+            name_offsets.tofile(f)
+            ids.tofile(f)
+            shutil.copyfileobj(blob, f)
+    del new_id, name_offsets, ids
+
+    scales = [GeoHeuristic(metric).calibrated_scale(cg) for metric in SCALED_METRICS]
+    with open(os.path.join(directory, "index.bin"), "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, weight_code.encode("ascii"),
+                                  n, cg.edge_count, len(keys), lat_step, lon_step, *scales))
+        for entry in entries:
+            f.write(TILE_ENTRY.pack(*entry))
+        f.write(TILE_ENTRY.pack(0, 0, n, cg.edge_count)) # End entry
+    return len(keys)
+
+class _Tile:
+    """One mapped tile file; its arrays are memoryviews into the mapping."""
+
+    def __init__(self, path, first, first_edge, weight_code):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, edges, names_length = TILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != TILE_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"'{path}' is not a tile of this format.")
+        self.first = first
+        self.count = count
+        self.first_edge = first_edge
+        self.edges = edges
+        view = memoryview(self._mmap)
+        position = TILE_HEADER.size
+        arrays = []
+        for code, size in (('q', count + 1), ('q', edges), (weight_code, edges), ('d', count), ('d', count)):
+            arrays.append(view[position:position + 8 * size].cast(code))
+            position += 8 * size
+        self.offsets, self.targets, self.weights, self.lat, self.lon = arrays
+        self.eatery = view[position:position + count]
+        position += _padded(count)
+        self._names_view = view[position:position + names_length]
+        self._names = None
+
+    @property
+    def names(self):
+        # Decoded on first use; only path output needs them
+        if self._names is None:
+            self._names = bytes(self._names_view).decode("utf-8").split("\n") if self.count else []
+        return self._names
+
+class _NodeColumn:
+    """
+    Read-only per-node array of a TiledGraph (names, lat, lon or offsets), served from
+    whichever tile holds the node. The last tile used is remembered, so runs of lookups
+    in one tile skip the tile table.
+    """
+
+    def __init__(self, tiled, field, extra=0):
+        self._tiled = tiled
+        self._field = field
+        self._extra = extra # offsets has one more entry per tile than there are nodes
+        self._lo = self._hi = 0
+        self._values = None
+
+    def __len__(self):
+        return len(self._tiled) + self._extra
+
+    def __getitem__(self, i):
+        if not self._lo <= i < self._hi:
+            tile = self._tiled.tile_of_node(i)
+            self._lo, self._hi = tile.first, tile.first + tile.count + self._extra
+            self._values = getattr(tile, self._field)
+            if not self._lo <= i < self._hi:
+                raise IndexError("node id out of range")
+        return self._values[i - self._lo]
+
+class _EdgeColumn:
+    """Read-only per-edge array of a TiledGraph (targets or weights); see _NodeColumn."""
+
+    def __init__(self, tiled, field):
+        self._tiled = tiled
+        self._field = field
+        self._lo = self._hi = 0
+        self._values = None
+
+    def __len__(self):
+        return self._tiled.edge_count
+
+    def __getitem__(self, i):
+        if not self._lo <= i < self._hi:
+            tile = self._tiled.tile_of_edge(i)
+            self._lo, self._hi = tile.first_edge, tile.first_edge + tile.edges
+            self._values = getattr(tile, self._field)
+            if not self._lo <= i < self._hi:
+                raise IndexError("edge index out of range")
+        return self._values[i - self._lo]
+
+class _NameLookup:
+    """Case-insensitive name -> id mapping that bisects names.bin without loading tiles."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, _ = NAMES_HEADER.unpack_from(self._mmap, 0)
+        if magic != NAMES_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"'{path}' is not a tiled graph name index.")
+        view = memoryview(self._mmap)
+        position = NAMES_HEADER.size
+        self._offsets = view[position:position + 8 * (n + 1)].cast('q')
+        position += 8 * (n + 1)
+        self._ids = view[position:position + 8 * n].cast('q')
+        self._blob = position + 8 * n
+        self._n = n
+
+    def _name(self, k):
+        return self._mmap[self._blob + self._offsets[k]:self._blob + self._offsets[k + 1]]
+
+    def get(self, name, default=None):
+        key = str(name).lower().encode("utf-8")
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._name(lo) == key:
+            return self._ids[lo]
+        return default
+
+    def __getitem__(self, name):
+        node = self.get(name)
+        if node is None:
+            raise KeyError(name)
+        return node
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        return self._n
+
+class TiledGraph:
+    """
+    A graph written by build_tiles(), read tile by tile on demand with at most
+    max_tiles tiles mapped at once. Usable wherever the search kernels expect a
+    CompiledGraph; see the module comment for what is not supported.
+    """
+
+    # Search state in dicts, not one list entry per node (see compiled_graph.node_array)
+    sparse = True
+
+    def __init__(self, directory, max_tiles=64):
+        self.directory = directory
+        self.max_tiles = max_tiles
+        with open(os.path.join(directory, "index.bin"), "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+            magic, version, mark, weight_code, n, m, tile_count, self.lat_step, self.lon_step, *scales = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"'{directory}' does not hold a tiled graph.")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported tiled graph version {version}.")
+            if mark != BYTE_ORDER_MARK:
+                raise ValueError("Tiles were written on a machine with a different byte order.")
+            table = array('q')
+            table.fromfile(f, 4 * (tile_count + 1))
+        self._n = n
+        self._m = m
+        self._weight_code = weight_code.decode("ascii")
+        self._firsts = table[2::4]      # First node id per tile, then n
+        self._first_edges = table[3::4] # First edge index per tile, then m
+        self._tile_count = tile_count
+        self._tiles = OrderedDict()     # Mapped tiles, least recently used first
+        self.tile_loads = 0
+
+        self.offsets = _NodeColumn(self, "offsets", extra=1)
+        self.targets = _EdgeColumn(self, "targets")
+        self.weights = _EdgeColumn(self, "weights")
+        self.lat = _NodeColumn(self, "lat")
+        self.lon = _NodeColumn(self, "lon")
+        self.names = _NodeColumn(self, "names")
+        self.ids = _NameLookup(os.path.join(directory, "names.bin"))
+        # Seeded so GeoHeuristic does not calibrate itself over every edge
+        self.cache = {("geo_scale", metric): scale for metric, scale in zip(SCALED_METRICS, scales)}
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def edge_count(self):
+        return self._m
+
+    @property
+    def tile_count(self):
+        return self._tile_count
+
+    @property
+    def resident_tiles(self):
+        return len(self._tiles)
+
+    def node_id(self, name):
+        """Return the integer id of a node name (case-insensitive), or None if it is not in the graph."""
+        return self.ids.get(name)
+
+    def neighbors(self, node_id):
+        """Yield (neighbor_id, weight) pairs for the outgoing edges of node_id."""
+        for i in range(self.offsets[node_id], self.offsets[node_id + 1]):
+            yield self.targets[i], self.weights[i]
+
+    def is_eatery(self, node_id):
+        tile = self.tile_of_node(node_id)
+        return bool(tile.eatery[node_id - tile.first])
+
+    def path_names(self, path_ids):
+        """Convert a list of node ids back to node names."""
+        names = self.names
+        return [names[i] for i in path_ids]
+
+    def reversed(self):
+        raise NotImplementedError("Tiled graphs store outgoing edges only; use ucs or astar.")
+
+    def _tile(self, index):
+        tile = self._tiles.get(index)
+        if tile is not None:
+            self._tiles.move_to_end(index)
+            return tile
+        tile = _Tile(os.path.join(self.directory, f"tile-{index}.bin"), self._firsts[index], self._first_edges[index], self._weight_code)
+        self.tile_loads += 1
+        self._tiles[index] = tile
+        # Dropping a tile unmaps it once no column still points into it
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def tile_of_node(self, node_id):
+        return self._tile(min(bisect.bisect_right(self._firsts, node_id), self._tile_count) - 1)
+
+    def tile_of_edge(self, edge):
+        return self._tile(min(bisect.bisect_right(self._first_edges, edge), self._tile_count) - 1)
+
+def main(argv=None):
+    import argparse
+    import resource
+    import time
+    from router import ALGORITHMS, Router, format_node_name_for_display
+
+    parser = argparse.ArgumentParser(description="Build or query a tiled, lazily loaded graph.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="split a map file into tiles")
+    build_parser.add_argument("map", help="map file (see graph_io.load_map) or 'campus'")
+    build_parser.add_argument("directory")
+    build_parser.add_argument("--edges", help="edges file for CSV maps")
+    build_parser.add_argument("--tile-meters", type=float, default=1000, help="tile side in metres (default 1000)")
+    route_parser = commands.add_parser("route", help="find a route on a tiled graph")
+    route_parser.add_argument("directory")
+    route_parser.add_argument("start")
+    route_parser.add_argument("goal")
+    route_parser.add_argument("--algorithm", choices=("ucs", "astar"), default="astar")
+    route_parser.add_argument("--max-tiles", type=int, default=64, help="tiles kept mapped at once (default 64)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if args.map != "campus" and is_snapshot(args.map):
+            # Tiled straight from the mapped file; the map is never loaded
+            cg, non_eatery_nodes = map_snapshot(args.map), ()
+        else:
+            router = Router() if args.map == "campus" else Router.load(args.map, args.edges)
+            cg, non_eatery_nodes = router.compiled, router.non_eatery_nodes
+        count = build_tiles(cg, args.directory, non_eatery_nodes, args.tile_meters,
+                            lambda done, total: print(f"\rTile {done}/{total}", end="", flush=True))
+        print(f"\nWrote {count} tiles for {len(cg)} nodes to {args.directory}")
+        return 0
+
+    tiled = TiledGraph(args.directory, args.max_tiles)
+    start, goal = tiled.node_id(args.start), tiled.node_id(args.goal)
+    for text, node in ((args.start, start), (args.goal, goal)):
+        if node is None:
+            print(f"Node '{format_node_name_for_display(text)}' does not exist in the graph.")
+            return 1
+    started = time.perf_counter()
+    path_ids, total_cost, nodes_visited = ALGORITHMS[args.algorithm](tiled, start, goal)
+    elapsed_time = time.perf_counter() - started
+    if path_ids is None:
+        print(f"No path exists from '{format_node_name_for_display(args.start)}' to '{format_node_name_for_display(args.goal)}'.")
+    else:
+        print("Path:", " -> ".join(format_node_name_for_display(name) for name in tiled.path_names(path_ids)))
+        print("Total cost:", total_cost)
+    print(f"Nodes visited: {nodes_visited}")
+    print(f"Time taken: {elapsed_time:.6f} seconds")
+    print(f"Tiles loaded: {tiled.tile_loads} of {tiled.tile_count} ({tiled.resident_tiles} mapped now)")
+    print(f"Peak resident memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
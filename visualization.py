@@ -0,0 +1,182 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import networkx as nx
+from matplotlib.figure import Figure # Object API only: no pyplot state, safe in a worker thread
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.patches as mpatches
+from matplotlib.lines import Line2D
+from PIL import Image
+from router import format_node_name_for_display
+
+# Rendering pipeline for the graph image. The static base layer (edges, nodes, labels) is
+# drawn once per graph version and level of detail and kept as an image; each route is
+# drawn on a transparent overlay with the same axes limits and composited on top, so a new
+# route only costs drawing its own path. Renders run on one background thread when asked.
+
+# Levels of detail, from most to least expensive to draw
+DETAIL_LEVELS = ("full", "labels", "minimal")
+
+def auto_detail(node_count):
+    """Pick a level of detail that keeps rendering fast on big maps."""
+    if node_count <= 200:
+        return "full"     # Node labels and edge cost labels
+    if node_count <= 2000:
+        return "labels"   # Node labels only
+    return "minimal"      # Nodes and edges only
+
+# Color and line style of each alternative route, cycled when there are more routes
+ALTERNATIVE_STYLES = (
+    ("royalblue", "dashed"),
+    ("darkorange", "dotted"),
+    ("seagreen", "dashdot"),
+    ("purple", (0, (5, 2, 1, 2, 1, 2))),
+    ("saddlebrown", (0, (1, 3))),
+)
+
+def _node_size(detail):
+    return {"full": 1400, "labels": 300, "minimal": 20}[detail]
+
+def _new_figure(figsize, dpi, transparent=False):
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    if transparent:
+        fig.patch.set_alpha(0)
+    ax = fig.add_subplot()
+    ax.set_axis_off()
+    fig.subplots_adjust(left=0.08, right=0.92, top=0.92, bottom=0.08)
+    return fig, ax
+
+def _to_image(fig):
+    fig.canvas.draw()
+    width, height = fig.canvas.get_width_height()
+    return Image.frombuffer("RGBA", (width, height), bytes(fig.canvas.buffer_rgba()), "raw", "RGBA", 0, 1)
+
+class GraphRenderer:
+    """
+    Renders the graph image with an optional highlighted path. Base layers are cached by
+    (graph version, detail, size, dpi); pass version=None to always redraw the base.
+    """
+
+    def __init__(self, figsize=(30, 20), dpi=100, detail="auto", cache_size=4):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.detail = detail
+        self.cache_size = cache_size
+        self._bases = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _base_layer(self, graph, coordinates, non_eatery_nodes, version, detail):
+        key = (version, detail, self.figsize, self.dpi)
+        if version is not None and key in self._bases:
+            self._bases.move_to_end(key)
+            return self._bases[key]
+
+        G = nx.Graph()
+        for node, pos in coordinates.items():
+            if node in graph:
+                G.add_node(node, pos=pos)
+        for node, neighbors in graph.items():
+            for neighbor, weight in neighbors.items():
+                if not G.has_edge(node, neighbor) and node in coordinates and neighbor in coordinates:
+                    G.add_edge(node, neighbor, weight=weight)
+        pos = {node: (lon, lat) for node, (lat, lon) in coordinates.items() if node in G}
+        fig, ax = _new_figure(self.figsize, self.dpi)
+        # Node coloring
+        node_colors = ['lightblue' if node in non_eatery_nodes else 'plum' for node in G.nodes()]
+        nx.draw_networkx_edges(G, pos, edge_color='gray', ax=ax)
+        nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=_node_size(detail), ax=ax)
+        if detail in ("full", "labels"):
+            # Create formatted labels for display
+            labels = {node: format_node_name_for_display(node) for node in G.nodes()}
+            nx.draw_networkx_labels(G, pos, labels=labels, font_size=12 if detail == "full" else 6, ax=ax)
+        if detail == "full":
+            edge_labels = nx.get_edge_attributes(G, 'weight')
+            nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=10, ax=ax)
+        base = (_to_image(fig), ax.get_xlim(), ax.get_ylim(), pos)
+
+        if version is not None:
+            self._bases[key] = base
+            while len(self._bases) > self.cache_size:
+                self._bases.popitem(last=False)
+        return base
+
+    def render(self, graph, coordinates, non_eatery_nodes, image_path="graph_visualization.png", highlight_path=None, total_cost=None, version=None, alternatives=(), reached=()):
+        """
+        Draw the image (base layer from cache when possible) and save it to image_path.
+        `alternatives` holds other routes as (path, total_cost) pairs, drawn under the
+        highlighted path in the styles of ALTERNATIVE_STYLES. Nodes in `reached` (for
+        example everything within walking distance) get a ring around them.
+        """
+        with self._lock:
+            detail = self.detail if self.detail != "auto" else auto_detail(len(graph))
+            base_image, xlim, ylim, pos = self._base_layer(graph, coordinates, non_eatery_nodes, version, detail)
+            fig, ax = _new_figure(self.figsize, self.dpi, transparent=True)
+            has_path = highlight_path and len(highlight_path) > 1
+            reached_nodes = [node for node in reached if node in pos]
+            if reached_nodes:
+                G = nx.Graph()
+                G.add_nodes_from(reached_nodes)
+                nx.draw_networkx_nodes(G, pos, nodelist=reached_nodes, node_color='none', edgecolors='darkorange', linewidths=4, node_size=_node_size(detail) * 1.6, ax=ax)
+            alternative_handles = []
+            alternatives = list(alternatives or ())
+            for rank, (path, cost) in enumerate(alternatives):
+                path_edges = [(a, b) for a, b in zip(path, path[1:]) if a in pos and b in pos]
+                if not path_edges:
+                    continue
+                color, style = ALTERNATIVE_STYLES[rank % len(ALTERNATIVE_STYLES)]
+                G = nx.Graph()
+                G.add_nodes_from(node for node in path if node in pos)
+                # Earlier routes are drawn wider, so they still show where later ones share edges
+                width = 3 + 3 * (len(alternatives) - 1 - rank)
+                nx.draw_networkx_edges(G, pos, edgelist=path_edges, edge_color=color, style=style, width=width, alpha=0.8, ax=ax)
+                alternative_handles.append(Line2D([], [], color=color, linestyle=style, linewidth=3, label=f"Alternative {rank + 1} (cost {cost})"))
+            if has_path:
+                G = nx.Graph()
+                G.add_nodes_from(node for node in highlight_path if node in pos)
+                path_edges = [(a, b) for a, b in zip(highlight_path, highlight_path[1:]) if a in pos and b in pos]
+                nx.draw_networkx_edges(G, pos, edgelist=path_edges, edge_color='red', width=3, alpha=0.5, ax=ax)
+                ends = [node for node in (highlight_path[0], highlight_path[-1]) if node in pos]
+                # Start or End (light green)
+                nx.draw_networkx_nodes(G, pos, nodelist=ends, node_color='lightgreen', node_size=_node_size(detail), ax=ax)
+                if detail != "minimal":
+                    nx.draw_networkx_labels(G, pos, labels={node: format_node_name_for_display(node) for node in ends}, font_size=12 if detail == "full" else 6, ax=ax)
+            # Add total cost as text on the image if provided
+            if total_cost is not None and has_path:
+                ax.text(0.5, 0.97, f"Total cost: {total_cost}", fontsize=24, color='black', ha='center', va='top', transform=ax.transAxes, bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+            # Add legend
+            legend_handles = [
+                mpatches.Patch(color='plum', label='Eatery'),
+                mpatches.Patch(color='lightblue', label='Non-eatery'),
+            ]
+            if has_path:
+                legend_handles.append(mpatches.Patch(color='lightgreen', label='Start/End Node'))
+                legend_handles.append(mpatches.Patch(color='red', label='Best Path', alpha=0.5))
+            legend_handles.extend(alternative_handles)
+            if reached_nodes:
+                legend_handles.append(Line2D([], [], marker='o', linestyle='none', markersize=16, markerfacecolor='none', markeredgecolor='darkorange', markeredgewidth=3, label='Within reach'))
+            ax.legend(handles=legend_handles, loc='lower left', fontsize=16, framealpha=1)
+            # Same limits as the base layer so the overlay lines up with it
+            ax.set_xlim(xlim)
+            ax.set_ylim(ylim)
+            Image.alpha_composite(base_image, _to_image(fig)).save(image_path, compress_level=1) # Fast PNG encoding
+        return image_path
+
+    def render_async(self, *args, **kwargs):
+        """Queue render() on the background worker and return a Future for the image path."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graph-render")
+        return self._executor.submit(self.render, *args, **kwargs)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Renderer shared by generate_graph_image
+default_renderer = GraphRenderer()
+
+# Function to generate and save the graph image
+def generate_graph_image(graph, coordinates, non_eatery_nodes, image_path="graph_visualization.png", highlight_path=None, total_cost=None, version=None, alternatives=(), reached=()):
+    return default_renderer.render(graph, coordinates, non_eatery_nodes, image_path, highlight_path, total_cost, version, alternatives, reached)